@@ -0,0 +1,20 @@
+"""
+Benchmarks for the credit API.
+
+Run from the backend directory (uses DJANGO_SETTINGS_MODULE, default
+credit_approval.settings):
+
+    python -m benchmarks seed --customers 100000 --loans-per-customer 5
+    python -m benchmarks micro --output micro.json
+    python -m benchmarks load --base-url http://localhost:8000 --duration 30 --output load.json
+    python -m benchmarks connections --output connections.json
+    python -m benchmarks compare micro.json --baseline benchmarks/baselines/micro.json
+
+Sync against async views (serve with uvicorn credit_approval.asgi:application):
+
+    python -m benchmarks load --mix sync --concurrency 64 --output sync.json
+    python -m benchmarks load --mix async --concurrency 64 --output async.json
+    python -m benchmarks compare async.json --baseline sync.json
+
+micro and load take --baseline as well and exit non-zero on a regression.
+"""
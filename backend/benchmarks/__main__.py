@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+from .load import MIXES
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval.settings')
+    import django
+    django.setup()
+
+
+def write_results(kind, results, args):
+    from django.db import connection
+
+    document = {
+        'meta': {
+            'kind': kind,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'options': {key: value for key, value in vars(args).items() if key not in ('handler', 'output')},
+        },
+        'results': results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    print(text)
+    return results
+
+
+def check_baseline(results, args):
+    from .baseline import compare, load_results
+
+    if not args.baseline:
+        return 0
+    regressions = compare(results, load_results(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION against {args.baseline} (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    print(f"\nNo regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+def seed(args):
+    from loans.synthetic import seed_portfolio
+
+    customers, loans = seed_portfolio(args.customers, args.loans_per_customer, seed=args.seed)
+    print(f"Seeded {customers} customers and {loans} loans")
+    return 0
+
+
+def micro(args):
+    from .micro import run_micro
+
+    results = run_micro(
+        iterations=args.iterations, customers=args.customers, loans_per_customer=args.loans_per_customer,
+        use_existing=args.use_existing, seed=args.seed,
+    )
+    return check_baseline(write_results('micro', results, args), args)
+
+
+def load(args):
+    from .load import run_load
+
+    results = run_load(
+        args.base_url, args.concurrency, args.duration, args.writes, args.seed, args.keep_alive, args.mix,
+    )
+    return check_baseline(write_results('load', results, args), args)
+
+
+def connections(args):
+    from .connections import run_connections
+
+    results = run_connections(args.iterations, args.max_age)
+    return check_baseline(write_results('connections', results, args), args)
+
+
+def compare(args):
+    from .baseline import load_results
+
+    return check_baseline(load_results(args.results), args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Credit API benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_output_options(command):
+        command.add_argument('--output', help="Write JSON results to this file")
+        command.add_argument('--baseline', help="Fail if results regress against this results file")
+        command.add_argument('--tolerance', type=float, default=0.2, help="Allowed regression (default 0.2 = 20%%)")
+
+    command = commands.add_parser('seed', help="Insert a synthetic portfolio into the configured database")
+    command.add_argument('--customers', type=int, default=10000)
+    command.add_argument('--loans-per-customer', type=float, default=5)
+    command.add_argument('--seed', type=int, default=0)
+    command.set_defaults(handler=seed)
+
+    command = commands.add_parser('micro', help="In-process micro-benchmarks")
+    command.add_argument('--iterations', type=int, default=200)
+    command.add_argument('--customers', type=int, default=2000, help="Synthetic customers seeded (rolled back)")
+    command.add_argument('--loans-per-customer', type=float, default=5)
+    command.add_argument('--use-existing', action='store_true', help="Benchmark existing data instead of seeding")
+    command.add_argument('--seed', type=int, default=0)
+    add_output_options(command)
+    command.set_defaults(handler=micro)
+
+    command = commands.add_parser('load', help="Concurrent HTTP load against a running server")
+    command.add_argument('--base-url', default='http://localhost:8000')
+    command.add_argument('--concurrency', type=int, default=8)
+    command.add_argument('--duration', type=float, default=30, help="Seconds")
+    command.add_argument('--writes', action='store_true', help="Include register and create-loan")
+    command.add_argument('--keep-alive', action='store_true', help="Reuse one connection per worker")
+    command.add_argument(
+        '--mix', choices=MIXES, default='full',
+        help="full endpoint mix, or only the endpoints with async versions, through their sync or async paths",
+    )
+    command.add_argument('--seed', type=int, default=0)
+    add_output_options(command)
+    command.set_defaults(handler=load)
+
+    command = commands.add_parser(
+        'connections', help="Read endpoint latency with per-request against persistent DB connections",
+    )
+    command.add_argument('--iterations', type=int, default=200)
+    command.add_argument('--max-age', type=int, help="CONN_MAX_AGE of the persistent run (default: settings, or 60)")
+    add_output_options(command)
+    command.set_defaults(handler=connections)
+
+    command = commands.add_parser('compare', help="Compare a results file against a baseline")
+    command.add_argument('results')
+    command.add_argument('--baseline', required=True)
+    command.add_argument('--tolerance', type=float, default=0.2)
+    command.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    if args.command != 'compare':
+        setup_django()
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Comparison of benchmark results against a stored baseline.
+
+A result regresses when its p95 latency grows, or its throughput drops, by
+more than the tolerance, or when it has errors the baseline did not.
+"""
+import json
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Return a list of human-readable regressions of `results` against `baseline`"""
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        if expected.get('p95_ms') and actual.get('p95_ms') is not None:
+            limit = expected['p95_ms'] * (1 + tolerance)
+            if actual['p95_ms'] > limit:
+                regressions.append(
+                    f"{name}: p95 {actual['p95_ms']:.3f}ms > {limit:.3f}ms (baseline {expected['p95_ms']:.3f}ms)"
+                )
+        if expected.get('ops_per_sec') and actual.get('ops_per_sec') is not None:
+            floor = expected['ops_per_sec'] * (1 - tolerance)
+            if actual['ops_per_sec'] < floor:
+                regressions.append(
+                    f"{name}: {actual['ops_per_sec']:.1f} ops/s < {floor:.1f} (baseline {expected['ops_per_sec']:.1f})"
+                )
+        if actual.get('errors', 0) > expected.get('errors', 0):
+            regressions.append(f"{name}: {actual['errors']} errors (baseline {expected.get('errors', 0)})")
+    return regressions
@@ -0,0 +1,67 @@
+"""
+Per-request latency of the read endpoints with a new database connection
+for every request (CONN_MAX_AGE=0) against a persistent one.
+
+Requests go through the full Django handler in-process, so connections are
+opened and closed exactly as under a WSGI server; what differs is only the
+connect (TCP, TLS and authentication) cost, which is what a remote or
+PgBouncer-fronted database adds. Uses the data already in the database.
+"""
+import random
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from loans.models import Customer, Loan
+
+from .stats import time_calls
+
+
+SAMPLE = 100
+
+
+def read_endpoints(customer_ids, loan_ids):
+    return [
+        ('view_loan_by_id', lambda rng: f'/api/view-loan/{rng.choice(loan_ids)}'),
+        ('view_loans_by_customer', lambda rng: f'/api/view-loans/{rng.choice(customer_ids)}'),
+        ('customer_list', lambda rng: '/api/customers/?pagination=cursor'),
+        ('loan_list', lambda rng: '/api/loans/?pagination=cursor'),
+    ]
+
+
+def set_max_age(max_age):
+    for connection in connections.all():
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+
+def run_connections(iterations=200, persistent_max_age=None):
+    """
+    Time each read endpoint with per-request and persistent connections;
+    returns {'<endpoint>_new_connection': summary, '<endpoint>_persistent': summary}
+    """
+    setup_test_environment()
+    customer_ids = list(Customer.objects.order_by('customer_id').values_list('customer_id', flat=True)[:SAMPLE])
+    loan_ids = list(Loan.objects.order_by('loan_id').values_list('loan_id', flat=True)[:SAMPLE])
+    if not customer_ids or not loan_ids:
+        raise RuntimeError("No loans to benchmark against; run `python -m benchmarks seed` first")
+
+    configured = connections['default'].settings_dict['CONN_MAX_AGE']
+    modes = [('new_connection', 0), ('persistent', persistent_max_age or configured or 60)]
+    client = Client()
+    results = {}
+    try:
+        for mode, max_age in modes:
+            set_max_age(max_age)
+            for name, path in read_endpoints(customer_ids, loan_ids):
+                rng = random.Random(0)
+
+                def call():
+                    response = client.get(path(rng))
+                    assert response.status_code == 200, response.status_code
+
+                results[f'{name}_{mode}'] = time_calls(call, iterations)
+    finally:
+        set_max_age(configured)
+    return results
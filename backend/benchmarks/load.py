@@ -0,0 +1,168 @@
+"""
+Concurrent HTTP load driver for the endpoints in loans/urls.py.
+
+Each worker thread issues requests drawn from the endpoint mix until the
+duration is up, on a fresh connection per request (as clients of a
+gunicorn sync worker see it) or, with keep_alive, on one persistent
+connection. Customer and loan ids
+are discovered from the running server, so it needs no database access.
+Read-only endpoints are used unless writes=True.
+
+With mix='sync' or mix='async' only the endpoints that have async
+counterparts are driven, through /api/ or /api/async/ respectively. Both
+report under the same names, so one run can be compared against the other
+(run the server under uvicorn for the async side; under WSGI every async
+view gets a thread and an event loop of its own).
+"""
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from .stats import summarize
+
+
+def connect(parts, timeout=60):
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    connection.connect()
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every request on a keep-alive connection
+    connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return connection
+
+
+def request(connection, method, path, body=None):
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    return response.status, data
+
+
+def discover(base_url, sample=200):
+    """Customer and loan ids to aim requests at, read through the API"""
+    parts = urlsplit(base_url)
+    connection = connect(parts, timeout=30)
+    status, data = request(connection, 'GET', '/api/loans/?pagination=cursor&page_size=100')
+    if status != 200:
+        raise RuntimeError(f"Could not list loans from {base_url}: HTTP {status}")
+    loans = json.loads(data)['results']
+    status, data = request(connection, 'GET', '/api/customers/?pagination=cursor&page_size=100')
+    customers = json.loads(data)['results']
+    connection.close()
+    if not loans or not customers:
+        raise RuntimeError("The server has no loans or customers; run `python -m benchmarks seed` first")
+    return [c['customer_id'] for c in customers][:sample], [loan['loan_id'] for loan in loans][:sample]
+
+
+MIXES = ('full', 'sync', 'async')
+
+
+def endpoint_mix(customer_ids, loan_ids, writes=False, mix='full'):
+    """(name, weight, request factory) for each endpoint"""
+    def application(rng):
+        return {
+            'customer_id': rng.choice(customer_ids), 'loan_amount': rng.randrange(10000, 500000, 1000),
+            'interest_rate': round(rng.uniform(8, 16), 2), 'tenure': rng.choice([12, 24, 36, 60]),
+        }
+
+    if mix != 'full':
+        prefix = '/api/async' if mix == 'async' else '/api'
+        return [
+            ('view_loan_by_id', 4, lambda rng: ('GET', f'{prefix}/view-loan/{rng.choice(loan_ids)}', None)),
+            ('view_loans_by_customer', 3, lambda rng: (
+                'GET', f'{prefix}/view-loans/{rng.choice(customer_ids)}', None)),
+            ('check_eligibility', 6, lambda rng: ('POST', f'{prefix}/check-eligibility', application(rng))),
+        ]
+
+    mix = [
+        ('customer_list', 2, lambda rng: ('GET', '/api/customers/', None)),
+        ('loan_list', 2, lambda rng: ('GET', '/api/loans/', None)),
+        ('loan_list_cursor', 1, lambda rng: ('GET', '/api/loans/?pagination=cursor', None)),
+        ('view_loan_by_id', 4, lambda rng: ('GET', f'/api/view-loan/{rng.choice(loan_ids)}', None)),
+        ('view_loans_by_customer', 3, lambda rng: ('GET', f'/api/view-loans/{rng.choice(customer_ids)}', None)),
+        ('check_eligibility', 6, lambda rng: ('POST', '/api/check-eligibility', application(rng))),
+        ('check_eligibility_batch', 1, lambda rng: (
+            'POST', '/api/check-eligibility/batch', [application(rng) for _ in range(100)])),
+        ('portfolio_summary', 1, lambda rng: ('GET', '/api/portfolio/summary', None)),
+    ]
+    if writes:
+        mix += [
+            ('register_customer', 1, lambda rng: ('POST', '/api/register', {
+                'first_name': 'Load', 'last_name': 'Test', 'age': rng.randint(21, 65),
+                'phone_number': str(rng.randint(6000000000, 9999999999)), 'monthly_salary': rng.randint(20, 200) * 1000,
+            })),
+            ('create_loan', 1, lambda rng: ('POST', '/api/create-loan', {
+                'customer': rng.choice(customer_ids), 'loan_amount': 1000, 'interest_rate': 12,
+                'tenure': 12, 'start_date': time.strftime('%Y-%m-%d', time.localtime(time.time() + 86400)),
+            })),
+        ]
+    return mix
+
+
+def run_load(base_url, concurrency=8, duration=30, writes=False, seed=0, keep_alive=False, mix='full'):
+    """
+    Drive the server for `duration` seconds with `concurrency` threads.
+    Returns {endpoint: summary with p50/p95/p99, ops_per_sec and errors}, plus 'total'.
+    """
+    customer_ids, loan_ids = discover(base_url)
+    mix = endpoint_mix(customer_ids, loan_ids, writes, mix)
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    factories = {name: factory for name, _, factory in mix}
+    parts = urlsplit(base_url)
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        connection = None
+        local_samples, local_errors = defaultdict(list), defaultdict(int)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = factories[name](rng)
+            start = time.perf_counter()
+            failed = False
+            try:
+                connection = connection or connect(parts)
+                status, _ = request(connection, method, path, body)
+            except (OSError, http.client.HTTPException):
+                status, failed = None, True
+            if (failed or not keep_alive) and connection is not None:
+                connection.close()
+                connection = None
+            local_samples[name].append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                local_errors[name] += 1
+        if connection is not None:
+            connection.close()
+        with lock:
+            for name, durations in local_samples.items():
+                samples[name].extend(durations)
+            for name, count in local_errors.items():
+                errors[name] += count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        if samples[name]:
+            results[name] = {**summarize(samples[name], elapsed), 'errors': errors[name]}
+    results['total'] = {
+        **summarize([d for durations in samples.values() for d in durations], elapsed),
+        'errors': sum(errors.values()),
+    }
+    return results
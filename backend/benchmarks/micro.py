@@ -0,0 +1,72 @@
+"""
+Micro-benchmarks of the hot code paths, run in-process against the
+configured database. Unless told to use existing data, a synthetic
+portfolio is seeded inside a transaction that is rolled back afterwards,
+so runs are reproducible and leave the database untouched.
+"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from loans import cache, finance
+from loans.models import Customer, Loan
+from loans.serializers import CustomerSerializer, LoanDetailSerializer, LoanSerializer
+from loans.synthetic import seed_portfolio
+from loans.views import calculate_credit_score, upload_excel_data
+
+from .stats import time_calls
+
+
+PAGE = 100
+UPLOAD_ROWS = 1000
+
+
+def loan_upload(customer_ids, rows):
+    lines = ['customer_id,loan_amount,tenure,interest_rate,emis_paid_on_time,start_date']
+    lines += [
+        f'{customer_ids[i % len(customer_ids)]},{50000 + i * 10},{12 + i % 48},{9 + i % 10},{i % 12},2024-01-01'
+        for i in range(rows)
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def benchmarks(iterations):
+    """(name, summary) for each micro-benchmark, using whatever data is in the database"""
+    customer = Customer.objects.order_by('customer_id').first()
+    if customer is None:
+        raise RuntimeError("No customers to benchmark against; seed some data first")
+    customers = list(Customer.objects.order_by('customer_id')[:PAGE])
+    loans = list(Loan.objects.select_related('customer').order_by('loan_id')[:PAGE])
+    customer_ids = [c.customer_id for c in customers]
+    factory = APIRequestFactory()
+
+    yield 'calculate_emi', time_calls(lambda: finance.calculate_emi(250000, 11.5, 36), iterations * 100)
+    yield 'calculate_emi_vectorized_10k', time_calls(
+        lambda: finance.emi([250000] * 10000, [11.5] * 10000, [36] * 10000), iterations)
+    yield 'calculate_credit_score_cold', time_calls(
+        lambda: calculate_credit_score(customer), iterations, setup=cache.get_cache().clear)
+    yield 'calculate_credit_score_cached', time_calls(lambda: calculate_credit_score(customer), iterations * 10)
+    yield f'customer_serializer_{PAGE}', time_calls(lambda: CustomerSerializer(customers, many=True).data, iterations)
+    yield f'loan_serializer_{PAGE}', time_calls(lambda: LoanSerializer(loans, many=True).data, iterations)
+    yield f'loan_detail_serializer_{PAGE}', time_calls(lambda: LoanDetailSerializer(loans, many=True).data, iterations)
+
+    def upload():
+        file = SimpleUploadedFile('loans.csv', loan_upload(customer_ids, UPLOAD_ROWS))
+        request = factory.post('/api/upload-excel', {'loan_file': file}, format='multipart')
+        with transaction.atomic():
+            response = upload_excel_data(request)
+            transaction.set_rollback(True)
+        assert response.data['loans']['created'] == UPLOAD_ROWS, response.data
+
+    yield f'upload_excel_data_{UPLOAD_ROWS}_loans', time_calls(upload, max(iterations // 10, 3), warmup=1)
+
+
+def run_micro(iterations=200, customers=2000, loans_per_customer=5, use_existing=False, seed=0):
+    """Run every micro-benchmark; returns {name: summary}"""
+    with transaction.atomic():
+        if not use_existing:
+            seed_portfolio(customers, loans_per_customer, seed=seed)
+        results = dict(benchmarks(iterations))
+        transaction.set_rollback(True)
+    cache.get_cache().clear()
+    return results
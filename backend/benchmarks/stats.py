@@ -0,0 +1,36 @@
+import time
+
+import numpy as np
+
+
+def summarize(samples, elapsed=None):
+    """Latency summary of per-call durations in seconds; throughput if elapsed is given"""
+    samples = np.asarray(samples, dtype=float) * 1000
+    summary = {
+        'count': int(len(samples)),
+        'mean_ms': round(float(samples.mean()), 4) if len(samples) else None,
+    }
+    for percentile in (50, 95, 99):
+        summary[f'p{percentile}_ms'] = round(float(np.percentile(samples, percentile)), 4) if len(samples) else None
+    if elapsed:
+        summary['ops_per_sec'] = round(len(samples) / elapsed, 2)
+    return summary
+
+
+def time_calls(function, iterations, warmup=3, setup=None):
+    """
+    Call function() `iterations` times after `warmup` untimed calls and
+    summarize; setup(), if given, runs untimed before each call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        function()
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, elapsed=sum(samples))
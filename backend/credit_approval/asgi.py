@@ -0,0 +1,16 @@
+"""
+ASGI config for credit_approval project.
+
+Serves every endpoint; the views under /api/async/ run on the event loop,
+the DRF views in a thread per request. For example:
+
+    uvicorn credit_approval.asgi:application --workers 4
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval.settings')
+
+application = get_asgi_application()
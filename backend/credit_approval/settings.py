@@ -3,7 +3,7 @@ Django settings for credit_approval project.
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,6 +31,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware
+    'loans.metrics.RequestMetricsMiddleware',
+    # Before anything that reads the database (sessions, auth)
+    'loans.routers.ReplicaReadMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,7 +65,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'credit_approval.wsgi.application'
 
-# Database
+# Database. Connections are kept for DB_CONN_MAX_AGE seconds (0 closes them
+# after every request) and checked before reuse after an idle request.
+# DB_STATEMENT_TIMEOUT_MS is off by default because it applies to every
+# connection this process opens: set it in the web server's environment only,
+# so migrations and maintenance commands (rebuild_exposures,
+# rescore_portfolio, build_portfolio_snapshots --full) run without it.
+# Behind PgBouncer in transaction pooling mode set DB_PGBOUNCER=True: it
+# rejects the startup option used for the statement timeout, so set that on
+# the web role instead (ALTER ROLE ... SET statement_timeout = '30s') and run
+# the maintenance work as a role without it.
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DB_STATEMENT_TIMEOUT_MS = config('DB_STATEMENT_TIMEOUT_MS', default=0, cast=int)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -70,8 +86,39 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='postgres'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        # Exports read through server-side cursors inside a transaction, which
+        # PgBouncer's transaction pooling supports; disable them only for
+        # poolers that can't
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
     }
 }
+if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+    DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+
+# Read replicas, as comma-separated host or host:port entries sharing the
+# primary's name and credentials. GET requests read from one of them unless
+# the client wrote within REPLICA_PIN_SECONDS (loans/routers.py). Tests run
+# them as mirrors of the test database.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    host, _, port = replica.partition(':')
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['loans.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -128,3 +175,47 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only in development
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Background import jobs. With IMPORT_JOBS_RUN_IN_PROCESS=False, run
+# `python manage.py process_import_jobs` as a separate worker instead.
+IMPORT_JOBS_RUN_IN_PROCESS = config('IMPORT_JOBS_RUN_IN_PROCESS', default=True, cast=bool)
+IMPORT_JOB_WORKERS = config('IMPORT_JOB_WORKERS', default=2, cast=int)
+# A running job with no progress for this long lost its worker and is failed
+IMPORT_JOB_STALE_MINUTES = config('IMPORT_JOB_STALE_MINUTES', default=30, cast=int)
+
+# Batch eligibility: hard cap per request, and the size above which results
+# are scored and streamed as NDJSON a chunk at a time instead of returned as
+# a single JSON document
+ELIGIBILITY_BATCH_MAX_SIZE = config('ELIGIBILITY_BATCH_MAX_SIZE', default=10000, cast=int)
+ELIGIBILITY_BATCH_STREAM_THRESHOLD = config('ELIGIBILITY_BATCH_STREAM_THRESHOLD', default=1000, cast=int)
+
+# Largest what-if grid (amounts x tenures x rates) per /api/quote-grid request
+QUOTE_GRID_MAX_CELLS = config('QUOTE_GRID_MAX_CELLS', default=20000, cast=int)
+
+# Requests slower than this are logged with their SQL to the
+# 'loans.slow_requests' logger; 0 disables the log (and SQL capture)
+SLOW_REQUEST_THRESHOLD_MS = config('SLOW_REQUEST_THRESHOLD_MS', default=0, cast=int)
+
+# POST /api/create-loan responses kept for Idempotency-Key replays; purge
+# older keys with `python manage.py purge_idempotency_keys` (e.g. hourly)
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+
+# Dashboard summary is recomputed at most this often
+PORTFOLIO_SUMMARY_CACHE_SECONDS = config('PORTFOLIO_SUMMARY_CACHE_SECONDS', default=60, cast=int)
+
+# Caches. 'credit' holds per-customer credit profiles (loans/cache.py); it is
+# invalidated on writes, so TIMEOUT only bounds staleness across processes.
+# Use a shared backend (FileBasedCache, Redis) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'credit': {
+        'BACKEND': config('CREDIT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CREDIT_CACHE_LOCATION', default='credit-profiles'),
+        'TIMEOUT': config('CREDIT_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CREDIT_CACHE_MAX_ENTRIES', default=50000, cast=int),
+        },
+    },
+}
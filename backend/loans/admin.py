@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Customer, Loan
+from django.contrib import admin, messages
+from .models import CreditPolicy, Customer, Loan
+from .search import search_customers
 
 
 @admin.register(Customer)
@@ -8,6 +9,11 @@ class CustomerAdmin(admin.ModelAdmin):
     list_filter = ['age', 'created_at']
     search_fields = ['first_name', 'last_name', 'phone_number']
     readonly_fields = ['customer_id', 'approved_limit', 'created_at', 'updated_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields only turns the search box on; matching goes through
+        # the indexed search backend instead of an icontains OR per field
+        return search_customers(queryset, search_term, rank=False), False
     
     fieldsets = (
         ('Personal Information', {
@@ -46,3 +52,26 @@ class LoanAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(CreditPolicy)
+class CreditPolicyAdmin(admin.ModelAdmin):
+    list_display = ['version', 'name', 'is_active', 'lowest_score', 'new_customer_score', 'max_interest_rate', 'created_at']
+    list_filter = ['is_active']
+    readonly_fields = ['version', 'is_active', 'activated_at', 'created_at']
+    actions = ['activate']
+
+    def get_readonly_fields(self, request, obj=None):
+        # Scores and rescore runs name a version, so its rules stay as activated
+        if obj is not None and obj.activated_at:
+            return self.readonly_fields + CreditPolicy.RULE_FIELDS
+        return self.readonly_fields
+
+    @admin.action(description="Activate selected policy")
+    def activate(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one policy to activate.", messages.ERROR)
+            return
+        policy = queryset.get()
+        policy.activate()
+        self.message_user(request, f"{policy} is now active.")
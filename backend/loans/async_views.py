@@ -0,0 +1,96 @@
+"""
+Async versions of the eligibility and loan read endpoints.
+
+They are served side by side with the DRF views under /api/async/ and
+return the same payloads. Under ASGI a request waiting on the database
+holds no worker thread while it waits for the event loop to resume it, so
+one process can keep thousands of eligibility checks in flight. DRF views
+are synchronous, so these are plain Django async views that reuse the DRF
+serializers for validation and rendering (neither touches the database).
+"""
+import json
+
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from .credit import aget_credit_profile, evaluate_application
+from .models import Customer, Loan
+from .policy import aactive_policy
+from .serializers import CustomerSerializer, EligibilityRequestSerializer, LoanDetailSerializer
+
+
+# Django 4.2's view decorators (csrf_exempt, require_POST, ...) wrap views in
+# sync functions, so these views check the method themselves and are marked
+# CSRF-exempt like the DRF views by setting the attribute directly.
+
+def not_found():
+    # What DRF renders for Http404
+    return JsonResponse({'detail': 'Not found.'}, status=404)
+
+
+async def check_eligibility(request):
+    """
+    POST /api/async/check-eligibility
+    Async counterpart of /api/check-eligibility
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error'}, status=400)
+    serializer = EligibilityRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    validated_data = serializer.validated_data
+    try:
+        profile = await aget_credit_profile(validated_data['customer_id'])
+    except Customer.DoesNotExist:
+        return JsonResponse({'customer_id': ["Customer does not exist."]}, status=400)
+    # Resolved here: a version change needs a query, which can't run on the event loop
+    policy = await aactive_policy()
+    return JsonResponse(evaluate_application(
+        profile.score(policy),
+        profile.available_limit,
+        validated_data['loan_amount'],
+        validated_data['interest_rate'],
+        validated_data['tenure'],
+        policy=policy,
+    ))
+
+
+check_eligibility.csrf_exempt = True
+
+
+async def view_loan_by_id(request, loan_id):
+    """
+    GET /api/async/view-loan/<loan_id>
+    Async counterpart of /api/view-loan/<loan_id>
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        loan = await Loan.objects.select_related('customer').aget(loan_id=loan_id)
+    except Loan.DoesNotExist:
+        return not_found()
+    return JsonResponse(LoanDetailSerializer(loan).data)
+
+
+async def view_loans_by_customer(request, customer_id):
+    """
+    GET /api/async/view-loans/<customer_id>
+    Async counterpart of /api/view-loans/<customer_id>
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        customer = await Customer.objects.aget(customer_id=customer_id)
+    except Customer.DoesNotExist:
+        return not_found()
+    # As in the sync view, loans from the related manager share this customer instance
+    loans = [loan async for loan in customer.loans.order_by('-created_at')]
+    return JsonResponse({
+        'customer': CustomerSerializer(customer).data,
+        'loans': LoanDetailSerializer(loans, many=True).data,
+        'total_loans': len(loans),
+    })
@@ -0,0 +1,97 @@
+"""
+Read-through cache of per-customer credit profiles.
+
+Entries live in the 'credit' cache alias (settings.CACHES), which bounds them
+by TIMEOUT and MAX_ENTRIES. Each entry is the score-input tuple returned by
+credit.load_credit_profiles. loans/signals.py deletes a customer's entry
+whenever its customer row, one of its loans or its exposure row changes.
+
+The locmem backend is per process, so invalidation only reaches the process
+that made the write; run several workers against a shared backend
+(file-based, Redis, ...) or accept up to TIMEOUT seconds of staleness.
+"""
+import threading
+
+from django.core.cache import caches
+
+
+CACHE_ALIAS = 'credit'
+KEY_PREFIX = 'credit-profile'
+
+
+class CacheStats:
+    """Hit/miss/invalidation counters for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def record(self, hits=0, misses=0, invalidations=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.invalidations += invalidations
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def profile_key(customer_id):
+    return f'{KEY_PREFIX}:{customer_id}'
+
+
+def get_profiles(customer_ids, load):
+    """
+    Return {customer_id: profile} for the given ids, reading the cache first
+    and calling load(missing_ids) -> {customer_id: profile} for the rest.
+    Ids that load() does not return are not cached.
+    """
+    keys = {profile_key(customer_id): customer_id for customer_id in customer_ids}
+    cache = get_cache()
+    profiles = {keys[key]: tuple(value) for key, value in cache.get_many(list(keys)).items()}
+    missing = [customer_id for customer_id in keys.values() if customer_id not in profiles]
+    stats.record(hits=len(profiles), misses=len(missing))
+    if missing:
+        loaded = load(missing)
+        cache.set_many({profile_key(customer_id): profile for customer_id, profile in loaded.items()})
+        profiles.update(loaded)
+    return profiles
+
+
+async def aget_profiles(customer_ids, aload):
+    """get_profiles for async views: the cache is read and written with its async API"""
+    keys = {profile_key(customer_id): customer_id for customer_id in customer_ids}
+    cache = get_cache()
+    profiles = {keys[key]: tuple(value) for key, value in (await cache.aget_many(list(keys))).items()}
+    missing = [customer_id for customer_id in keys.values() if customer_id not in profiles]
+    stats.record(hits=len(profiles), misses=len(missing))
+    if missing:
+        loaded = await aload(missing)
+        await cache.aset_many({profile_key(customer_id): profile for customer_id, profile in loaded.items()})
+        profiles.update(loaded)
+    return profiles
+
+
+def invalidate(customer_ids):
+    keys = [profile_key(customer_id) for customer_id in customer_ids]
+    if keys:
+        get_cache().delete_many(keys)
+        stats.record(invalidations=len(keys))
@@ -0,0 +1,235 @@
+"""
+Customer credit profile: everything credit scoring and limit checks need,
+read from the customer's exposure row in the same query as the customer,
+plus the approval rules that turn a score into an offer. Array versions of
+the scoring and approval rules serve batch endpoints. The rules themselves
+are the active credit policy (loans/policy.py); each function takes an
+optional compiled policy so a caller can apply one version throughout.
+"""
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+
+from . import cache
+from .ingest import ChunkValidator
+from .models import Customer, CustomerExposure
+from .policy import active_policy
+
+
+# Applications scored per query and array pass when a batch is streamed
+BATCH_CHUNK_SIZE = 1000
+
+
+def with_credit_profile(queryset):
+    """Join each customer's exposure row so it can be scored without more queries"""
+    return queryset.select_related('exposure')
+
+
+def score_from_history(total_emis, total_paid_on_time, policy=None):
+    """Map EMI payment history onto the 1-10 credit score ladder"""
+    return (policy or active_policy()).score(total_emis, total_paid_on_time)
+
+
+class CreditProfile:
+    """Score inputs and current utilization for one customer"""
+
+    def __init__(self, customer_id, approved_limit, total_emis, total_paid_on_time, current_utilization,
+                 active_loan_count=0):
+        self.customer_id = customer_id
+        self.approved_limit = approved_limit
+        self.total_emis = total_emis
+        self.total_paid_on_time = total_paid_on_time
+        self.current_utilization = current_utilization
+        self.active_loan_count = active_loan_count
+
+    @classmethod
+    def from_customer(cls, customer):
+        """Build a profile from the customer's exposure row"""
+        try:
+            exposure = customer.exposure
+        except CustomerExposure.DoesNotExist:
+            # Customers created before the ledger existed
+            CustomerExposure.rebuild([customer.customer_id])
+            exposure = CustomerExposure.objects.get(customer=customer)
+        return cls(
+            customer.customer_id,
+            customer.approved_limit,
+            exposure.total_emis,
+            exposure.emis_paid_on_time,
+            exposure.total_principal,
+            exposure.active_loan_count,
+        )
+
+    @property
+    def credit_score(self):
+        return self.score()
+
+    def score(self, policy=None):
+        """Credit score under the given policy, or the active one"""
+        return score_from_history(self.total_emis, self.total_paid_on_time, policy)
+
+    @property
+    def available_limit(self):
+        return self.approved_limit - self.current_utilization
+
+
+def get_credit_profile(customer_id):
+    """
+    Credit profile of one customer, from the cache or one query.
+    Raises Customer.DoesNotExist if there is no such customer.
+    """
+    profile = load_credit_profiles([customer_id]).get(customer_id)
+    if profile is None:
+        raise Customer.DoesNotExist(f"Customer {customer_id} does not exist.")
+    return CreditProfile(customer_id, *profile)
+
+
+async def aget_credit_profile(customer_id):
+    """Async version of get_credit_profile"""
+    profile = (await aload_credit_profiles([customer_id])).get(customer_id)
+    if profile is None:
+        raise Customer.DoesNotExist(f"Customer {customer_id} does not exist.")
+    return CreditProfile(customer_id, *profile)
+
+
+def evaluate_application(credit_score, available_limit, loan_amount, interest_rate, tenure, policy=None):
+    """Apply the approval tiers to one application"""
+    return (policy or active_policy()).evaluate(credit_score, available_limit, loan_amount, interest_rate, tenure)
+
+
+def scores_from_history(total_emis, total_paid_on_time, policy=None):
+    """Array version of score_from_history"""
+    return (policy or active_policy()).scores(total_emis, total_paid_on_time)
+
+
+def evaluate_applications(credit_scores, available_limits, loan_amounts, interest_rates, tenures, policy=None):
+    """
+    Array version of evaluate_application. Returns a dict of equal-length
+    arrays keyed like the single-application response.
+    """
+    return (policy or active_policy()).evaluate_many(
+        credit_scores, available_limits, loan_amounts, interest_rates, tenures,
+    )
+
+
+def quote_grid(credit_score, available_limit, loan_amounts, tenures, interest_rates, policy=None):
+    """
+    Every combination of the given amounts, tenures and rates for one
+    customer, in one pass of evaluate_applications. Returns the same keys
+    as evaluate_applications, each an array of shape
+    (len(loan_amounts), len(tenures), len(interest_rates)).
+    """
+    amounts, tenure_grid, rates = np.meshgrid(loan_amounts, tenures, interest_rates, indexing='ij')
+    shape = amounts.shape
+    results = evaluate_applications(
+        np.full(amounts.size, credit_score),
+        np.full(amounts.size, available_limit),
+        amounts.ravel(),
+        rates.ravel(),
+        tenure_grid.ravel(),
+        policy=policy,
+    )
+    return {key: values.reshape(shape) for key, values in results.items()}
+
+
+def load_credit_profiles(customer_ids):
+    """
+    Score inputs for many customers, read through the credit cache.
+    Returns {customer_id: (approved_limit, total_emis, total_paid_on_time,
+    current_utilization, active_loan_count)}; unknown ids are left out.
+    """
+    return cache.get_profiles(customer_ids, query_credit_profiles)
+
+
+def credit_profile_rows(customer_ids):
+    """(customer_id, *profile) rows; the exposure columns are None if the ledger row is missing"""
+    return with_credit_profile(Customer.objects.filter(customer_id__in=customer_ids)).values_list(
+        'customer_id', 'approved_limit', 'exposure__total_emis',
+        'exposure__emis_paid_on_time', 'exposure__total_principal',
+        'exposure__active_loan_count',
+    )
+
+
+def query_credit_profiles(customer_ids):
+    """load_credit_profiles straight from the database, in one query"""
+    rows = list(credit_profile_rows(customer_ids))
+    # Customers created before the ledger existed
+    missing = [row[0] for row in rows if row[2] is None]
+    if missing:
+        CustomerExposure.rebuild(missing)
+        return query_credit_profiles(customer_ids)
+    return {row[0]: row[1:] for row in rows}
+
+
+async def aload_credit_profiles(customer_ids):
+    """Async version of load_credit_profiles"""
+    return await cache.aget_profiles(customer_ids, aquery_credit_profiles)
+
+
+async def aquery_credit_profiles(customer_ids):
+    rows = [row async for row in credit_profile_rows(customer_ids)]
+    missing = [row[0] for row in rows if row[2] is None]
+    if missing:
+        await sync_to_async(CustomerExposure.rebuild)(missing)
+        return await aquery_credit_profiles(customer_ids)
+    return {row[0]: row[1:] for row in rows}
+
+
+BATCH_FIELDS = ['customer_id', 'loan_amount', 'interest_rate', 'tenure']
+
+
+def evaluate_batch(applications, policy=None):
+    """
+    Score a list of eligibility applications with one profile query.
+    Returns one result dict per application, in request order; invalid
+    applications get an 'error' entry instead of an offer.
+    """
+    frame = pd.DataFrame.from_records(
+        [application if isinstance(application, dict) else {} for application in applications],
+        columns=BATCH_FIELDS,
+    )
+    check = ChunkValidator(frame)
+    customer_ids = check.integer('customer_id', minimum=1)
+    loan_amounts = check.integer('loan_amount', minimum=1)
+    interest_rates = check.number('interest_rate', 0.1, 50.0)
+    tenures = check.integer('tenure', minimum=1, maximum=360)
+
+    profiles = load_credit_profiles(np.unique(customer_ids[check.valid]).tolist())
+    known_ids = np.array(sorted(profiles), dtype=np.int64)
+    position = np.searchsorted(known_ids, customer_ids).clip(max=max(len(known_ids) - 1, 0))
+    known = known_ids[position] == customer_ids if len(known_ids) else np.zeros(len(frame), dtype=bool)
+    check.flag(~known, "Customer does not exist.")
+
+    valid = check.valid
+    columns = np.array([profiles[customer_id] for customer_id in known_ids.tolist()], dtype=float).reshape(-1, 5)
+    approved_limits, total_emis, total_paid, utilization = (columns[position[valid], i] for i in range(4))
+    policy = policy or active_policy()
+    offers = evaluate_applications(
+        scores_from_history(total_emis, total_paid, policy),
+        approved_limits - utilization,
+        loan_amounts[valid],
+        interest_rates[valid],
+        tenures[valid],
+        policy=policy,
+    )
+
+    results = [
+        {'customer_id': application.get('customer_id') if isinstance(application, dict) else None, 'error': problem}
+        for application, problem in zip(applications, check.problems.tolist())
+    ]
+    offer_rows = zip(*(offers[key].tolist() for key in offers))
+    for index, customer_id, row in zip(np.flatnonzero(valid).tolist(), customer_ids[valid].tolist(), offer_rows):
+        results[index] = {'customer_id': customer_id, **dict(zip(offers, row))}
+    return results
+
+
+def evaluate_batch_chunks(applications, chunk_size=None):
+    """
+    evaluate_batch over chunk_size (default BATCH_CHUNK_SIZE) applications
+    at a time, yielding each chunk's results as it is scored. Every chunk
+    uses the policy active when the first one is scored.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    policy = active_policy()
+    for start in range(0, len(applications), chunk_size):
+        yield evaluate_batch(applications[start:start + chunk_size], policy=policy)
@@ -0,0 +1,101 @@
+"""
+Streaming exports of the loan book and customer list.
+
+Rows come from values_list().iterator(), so only one chunk of tuples is in
+memory at a time (a server-side cursor on PostgreSQL, read inside a
+transaction so it also works behind PgBouncer's transaction pooling), and
+they are encoded as CSV or NDJSON in batches as the response is sent. Derived loan
+fields use the same formulas as the Loan properties.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+LOAN_COLUMNS = [
+    'loan_id', 'customer_id', 'customer__first_name', 'customer__last_name', 'loan_amount', 'tenure',
+    'interest_rate', 'monthly_payment', 'emis_paid_on_time', 'start_date', 'end_date', 'created_at',
+]
+LOAN_HEADER = [
+    'loan_id', 'customer_id', 'customer_first_name', 'customer_last_name', 'loan_amount', 'tenure',
+    'interest_rate', 'monthly_payment', 'emis_paid_on_time', 'start_date', 'end_date', 'created_at',
+    'total_amount', 'remaining_amount', 'payment_percentage',
+]
+
+CUSTOMER_COLUMNS = [
+    'customer_id', 'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit',
+    'exposure__total_principal', 'exposure__active_loan_count', 'created_at',
+]
+CUSTOMER_HEADER = [
+    'customer_id', 'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit',
+    'current_debt', 'active_loans', 'created_at',
+]
+
+
+def fetch(queryset, columns):
+    """values_list rows of `queryset`, CHUNK_SIZE at a time"""
+    # Outside a transaction a pooler may send the next FETCH to a server
+    # connection that doesn't have the cursor
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+
+
+def loan_rows(queryset):
+    """Loan export rows with total_amount, remaining_amount and payment_percentage appended"""
+    for row in fetch(queryset, LOAN_COLUMNS):
+        tenure, monthly_payment, paid = row[5], row[7], row[8]
+        yield row + (
+            round(monthly_payment * tenure, 2),
+            round(monthly_payment * (tenure - paid), 2),
+            round(paid / tenure * 100, 2) if tenure else 0,
+        )
+
+
+def customer_rows(queryset):
+    return fetch(queryset, CUSTOMER_COLUMNS)
+
+
+def encode_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(header, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, row)), default=str))
+        if len(lines) == CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def stream_loans(queryset, output):
+    return ENCODERS[output](LOAN_HEADER, loan_rows(queryset.order_by('loan_id')))
+
+
+def stream_customers(queryset, output):
+    return ENCODERS[output](CUSTOMER_HEADER, customer_rows(queryset.order_by('customer_id')))
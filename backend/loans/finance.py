@@ -0,0 +1,105 @@
+"""
+EMI and amortization engine.
+
+Scalar helpers price a single loan; the array versions take NumPy arrays (or
+anything np.asarray accepts) of principal, annual rate and tenure and price
+whole portfolios in one pass.
+
+EMI = [P x R x (1+R)^N] / [(1+R)^N-1], where R is the monthly rate
+(annual rate / 12 / 100) and N the tenure in months.
+"""
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+
+def monthly_rate(annual_rate):
+    return annual_rate / (12 * 100)
+
+
+def calculate_emi(principal, rate, tenure):
+    """EMI of a single loan, rounded to paise"""
+    r = monthly_rate(rate)
+    if r > 0:
+        growth = (1 + r) ** tenure
+        emi = principal * r * growth / (growth - 1)
+    else:
+        emi = principal / tenure  # Simple division if rate is 0
+    return round(emi, 2)
+
+
+def calculate_end_date(start_date, tenure):
+    return start_date + relativedelta(months=tenure)
+
+
+def emi(principal, rate, tenure):
+    """EMI for arrays of loans, rounded to paise"""
+    principal = np.asarray(principal, dtype=float)
+    tenure = np.asarray(tenure, dtype=float)
+    r = monthly_rate(np.asarray(rate, dtype=float))
+    growth = np.power(1 + r, tenure)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(r > 0, principal * r * growth / (growth - 1), principal / tenure)
+    return np.round(payment, 2)
+
+
+def total_interest(principal, rate, tenure):
+    """Interest paid over the life of each loan at the rounded EMI"""
+    return emi(principal, rate, tenure) * np.asarray(tenure) - np.asarray(principal)
+
+
+def add_months(dates, months):
+    """Vectorized relativedelta(months=n): clamps to the last day of shorter months"""
+    dates = pd.DatetimeIndex(dates)
+    month_index = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1 + np.asarray(months)
+    first_of_month = pd.to_datetime({'year': month_index // 12, 'month': month_index % 12 + 1, 'day': 1})
+    days_in_month = first_of_month.dt.days_in_month.to_numpy()
+    days = np.minimum(dates.day.to_numpy(), days_in_month)
+    return (first_of_month + pd.to_timedelta(days - 1, unit='D')).dt.date.to_numpy()
+
+
+def end_dates(start_dates, tenure):
+    """Array counterpart of calculate_end_date"""
+    return add_months(start_dates, tenure)
+
+
+def amortization_schedules(principal, rate, tenure, payment=None):
+    """
+    Month-by-month schedules for many loans at once.
+
+    Returns (principal_part, interest_part, balance) as float64 arrays of shape
+    (loans, max tenure); months past a loan's tenure are zero. The rounded EMI
+    is used for every month except the last, which clears the remaining
+    balance. Memory is 24 bytes per loan-month, so price large books in batches.
+    """
+    principal = np.atleast_1d(np.asarray(principal, dtype=float))
+    tenure = np.atleast_1d(np.asarray(tenure, dtype=np.int64))
+    r = np.atleast_1d(monthly_rate(np.asarray(rate, dtype=float)))
+    if payment is None:
+        payment = emi(principal, rate, tenure)
+    payment = np.atleast_1d(np.asarray(payment, dtype=float))
+
+    months = np.arange(1, int(tenure.max(initial=0)) + 1)
+    growth = np.power(1 + r[:, None], months[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Closed-form outstanding balance after k payments
+        balance = np.where(
+            r[:, None] > 0,
+            principal[:, None] * growth - payment[:, None] * (growth - 1) / r[:, None],
+            principal[:, None] - payment[:, None] * months[None, :],
+        )
+    in_term = months[None, :] <= tenure[:, None]
+    balance = np.where(months[None, :] < tenure[:, None], balance, 0.0)
+    balance = np.where(in_term, np.maximum(balance, 0.0), 0.0)
+
+    opening = np.concatenate([principal[:, None], balance[:, :-1]], axis=1)
+    opening = np.where(in_term, opening, 0.0)
+    interest_part = opening * r[:, None]
+    principal_part = opening - balance
+    return principal_part, interest_part, balance
+
+
+def amortization_schedule(principal, rate, tenure, payment=None):
+    """Schedule of a single loan as three arrays of length tenure"""
+    principal_part, interest_part, balance = amortization_schedules(principal, rate, tenure, payment)
+    return principal_part[0], interest_part[0], balance[0]
@@ -0,0 +1,66 @@
+"""
+Idempotency-Key support for POST /api/create-loan.
+
+The key is claimed at the start of the request's transaction by inserting
+its row, so a concurrent request with the same key blocks on that insert
+until the first commits, then reads the stored response and replays it
+without touching the loans table. Only successful creations are kept: a
+rejected request rolls its claim back, so the client can fix the body and
+retry under the same key. Keys older than IDEMPOTENCY_KEY_TTL_HOURS may be
+reused, and `python manage.py purge_idempotency_keys` deletes them.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(data):
+    """SHA-256 of a request body, independent of key order"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def expiry_cutoff(now=None):
+    """Keys created before this are expired"""
+    return (now or timezone.now()) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def claim(key, request_hash):
+    """
+    Claim `key` inside the current transaction. Returns (record, replay):
+    replay is True when an earlier request already completed under the key,
+    and its record holds the response to return.
+    """
+    record, created = IdempotencyKey.objects.select_for_update().get_or_create(
+        key=key, defaults={'request_hash': request_hash},
+    )
+    if created:
+        return record, False
+    if record.created_at < expiry_cutoff():
+        record.request_hash = request_hash
+        record.status_code = None
+        record.response = None
+        record.created_at = timezone.now()
+        record.save()
+        return record, False
+    return record, True
+
+
+def store(record, status_code, response):
+    record.status_code = status_code
+    record.response = response
+    record.save(update_fields=['status_code', 'response'])
+
+
+def purge_expired():
+    """Delete expired keys; returns how many were deleted"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_cutoff()).delete()
+    return deleted
@@ -0,0 +1,432 @@
+"""
+Bulk ingestion of customer, loan and payment files (CSV or Excel).
+
+Files are read in chunks, validated column-wise with pandas, and written with
+bulk_create inside one transaction per chunk. Invalid rows are skipped and
+reported individually; valid rows in the same chunk are still imported.
+"""
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from . import finance
+from .models import Customer, CustomerExposure, Loan, Payment, normalize_phone
+
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_STORED_ERRORS = 1000
+
+CUSTOMER_COLUMNS = ['first_name', 'last_name', 'age', 'phone_number', 'monthly_salary']
+LOAN_COLUMNS = ['customer_id', 'loan_amount', 'tenure', 'interest_rate']
+PAYMENT_COLUMNS = ['loan_id', 'installment', 'paid_date']
+
+# Payment files run to millions of rows; chunks stay small enough for the
+# loan id IN (...) lookups of each chunk
+PAYMENT_CHUNK_SIZE = 20000
+# (loan_id, installment) packed into one int64 for vectorized duplicate checks
+INSTALLMENT_KEY_BASE = 1000
+
+
+class ImportResult:
+    """Counts, per-row errors and throughput of one file import"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def rows_processed(self):
+        return self.created + self.failed
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.rows_processed / self.elapsed
+
+    def add_errors(self, rows, messages):
+        self.failed += len(rows)
+        room = MAX_STORED_ERRORS - len(self.errors)
+        for row, message in list(zip(rows, messages))[:room]:
+            self.errors.append(f"Row {row}: {message}")
+
+    def tick(self):
+        self.elapsed = time.monotonic() - self.started
+
+    def as_dict(self, max_errors=10):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors[:max_errors],
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def normalize_columns(df):
+    """Lower-case headers and turn spaces into underscores ('Loan Amount' -> 'loan_amount')"""
+    df.columns = [str(column).strip().lower().replace(' ', '_') for column in df.columns]
+    return df
+
+
+def read_chunks(file, name, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Excel file"""
+    if name.endswith('.xlsx'):
+        yield from _read_xlsx_chunks(file, chunk_size)
+    elif name.endswith('.xls'):
+        # Legacy .xls has no streaming reader; slice the loaded frame instead
+        df = normalize_columns(pd.read_excel(file))
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    else:
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, skipinitialspace=True):
+            yield normalize_columns(chunk)
+
+
+def _read_xlsx_chunks(file, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield normalize_columns(pd.DataFrame(buffer, columns=header))
+                buffer = []
+        if buffer:
+            yield normalize_columns(pd.DataFrame(buffer, columns=header))
+    finally:
+        workbook.close()
+
+
+class ChunkValidator:
+    """Collects the first validation problem of every row in a chunk"""
+
+    def __init__(self, df):
+        self.df = df
+        self.problems = np.full(len(df), '', dtype=object)
+
+    def flag(self, mask, message):
+        mask = np.asarray(mask, dtype=bool) & (self.problems == '')
+        self.problems[mask] = message
+
+    def integer(self, column, minimum=None, maximum=None, default=None):
+        """Coerce a column to int64, flagging blanks, fractions and out-of-range values"""
+        if column in self.df:
+            values = pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float)
+        else:
+            values = np.full(len(self.df), np.nan)
+        if default is not None:
+            values = np.where(np.isnan(values), default, values)
+        self.flag(np.isnan(values), f"{column} must be a whole number")
+        self.flag(~np.isnan(values) & (values != np.round(values)), f"{column} must be a whole number")
+        if minimum is not None:
+            self.flag(values < minimum, f"{column} must be at least {minimum}")
+        if maximum is not None:
+            self.flag(values > maximum, f"{column} must be at most {maximum}")
+        return np.nan_to_num(values).astype(np.int64)
+
+    def number(self, column, minimum, maximum):
+        values = pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float)
+        self.flag(np.isnan(values), f"{column} must be a number")
+        self.flag((values < minimum) | (values > maximum), f"{column} must be between {minimum} and {maximum}")
+        return np.nan_to_num(values)
+
+    def text(self, column, max_length):
+        values = self.df[column].map(_as_text).to_numpy(dtype=object)
+        lengths = np.fromiter((len(value) for value in values), dtype=np.int64, count=len(values))
+        self.flag(lengths == 0, f"{column} is required")
+        self.flag(lengths > max_length, f"{column} must be at most {max_length} characters")
+        return values
+
+    @property
+    def valid(self):
+        return self.problems == ''
+
+
+def _as_text(value):
+    """Cell value as stripped text; Excel stores phone numbers as floats"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _require_columns(df, columns):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def _row_numbers(offset, length):
+    # 1-based data row numbers, matching the old per-row importer
+    return np.arange(offset + 1, offset + length + 1)
+
+
+def import_customers(file, name, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import a customer file; approved_limit defaults to 36 x monthly_salary.
+    progress, if given, is called with the running ImportResult after each chunk.
+    """
+    result = ImportResult()
+    offset = 0
+    for chunk in read_chunks(file, name, chunk_size):
+        _require_columns(chunk, CUSTOMER_COLUMNS)
+        rows = _row_numbers(offset, len(chunk))
+        offset += len(chunk)
+
+        check = ChunkValidator(chunk)
+        first_names = check.text('first_name', 100)
+        last_names = check.text('last_name', 100)
+        phones = check.text('phone_number', 15)
+        ages = check.integer('age', minimum=18, maximum=100)
+        salaries = check.integer('monthly_salary', minimum=1)
+        limits = salaries * 36
+        if 'approved_limit' in chunk:
+            given = pd.to_numeric(chunk['approved_limit'], errors='coerce').to_numpy(dtype=float)
+            limits = np.where(given > 0, np.nan_to_num(given), limits).astype(np.int64)
+
+        valid = check.valid
+        result.add_errors(rows[~valid], check.problems[~valid])
+        customers = [
+            Customer(
+                first_name=first_name, last_name=last_name, age=int(age),
+                phone_number=phone, phone_digits=normalize_phone(phone),
+                monthly_salary=int(salary), approved_limit=int(limit),
+            )
+            for first_name, last_name, age, phone, salary, limit in zip(
+                first_names[valid], last_names[valid], ages[valid],
+                phones[valid], salaries[valid], limits[valid],
+            )
+        ]
+        with transaction.atomic():
+            created = Customer.objects.bulk_create(customers, batch_size=1000)
+            # bulk_create skips Customer.save, so open the exposure rows here
+            CustomerExposure.objects.bulk_create(
+                [CustomerExposure(customer_id=customer.customer_id) for customer in created],
+                batch_size=1000,
+            )
+        result.created += len(created)
+        result.tick()
+        if progress:
+            progress(result)
+    return result
+
+
+def import_loans(file, name, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import a loan book. EMI and end_date are computed per column, and
+    emis_paid_on_time is written in the same INSERT.
+
+    Rows are historical loans, so unlike create-loan there is no start-date
+    or credit-limit check; the exposure ledger is rebuilt for every customer
+    touched by a chunk. progress works as in import_customers.
+    """
+    result = ImportResult()
+    offset = 0
+    for chunk in read_chunks(file, name, chunk_size):
+        _require_columns(chunk, LOAN_COLUMNS)
+        rows = _row_numbers(offset, len(chunk))
+        offset += len(chunk)
+
+        check = ChunkValidator(chunk)
+        customer_ids = check.integer('customer_id', minimum=1)
+        amounts = check.integer('loan_amount', minimum=1)
+        tenures = check.integer('tenure', minimum=1, maximum=360)
+        rates = check.number('interest_rate', 0.1, 50.0)
+        emis_paid = check.integer('emis_paid_on_time', minimum=0, default=0)
+
+        if 'start_date' in chunk:
+            starts = pd.to_datetime(chunk['start_date'], errors='coerce')
+            check.flag(starts.isna() & chunk['start_date'].notna(), "start_date is not a valid date")
+            starts = starts.fillna(pd.Timestamp(date.today()))
+        else:
+            starts = pd.Series(pd.Timestamp(date.today()), index=chunk.index)
+
+        existing = Customer.objects.only('customer_id').in_bulk(np.unique(customer_ids).tolist())
+        known = np.fromiter((customer_id in existing for customer_id in customer_ids.tolist()), dtype=bool, count=len(customer_ids))
+        missing = ~known & check.valid
+        check.problems[missing] = [f"Customer {customer_id} not found" for customer_id in customer_ids[missing]]
+
+        valid = check.valid
+        result.add_errors(rows[~valid], check.problems[~valid])
+        if valid.any():
+            start_dates = starts.dt.date.to_numpy()[valid]
+            end_dates = finance.end_dates(starts[valid], tenures[valid])
+            payments = finance.emi(amounts[valid], rates[valid], tenures[valid])
+            loans = [
+                Loan(
+                    customer_id=int(customer_id), loan_amount=int(amount), tenure=int(tenure),
+                    interest_rate=float(rate), monthly_payment=float(payment),
+                    emis_paid_on_time=int(paid), start_date=start, end_date=end,
+                )
+                for customer_id, amount, tenure, rate, payment, paid, start, end in zip(
+                    customer_ids[valid], amounts[valid], tenures[valid], rates[valid],
+                    payments, emis_paid[valid], start_dates, end_dates,
+                )
+            ]
+            with transaction.atomic():
+                Loan.objects.bulk_create(loans, batch_size=1000)
+                CustomerExposure.rebuild(np.unique(customer_ids[valid]).tolist())
+            result.created += len(loans)
+        result.tick()
+        if progress:
+            progress(result)
+    return result
+
+
+def import_payments(file, name, chunk_size=PAYMENT_CHUNK_SIZE, progress=None):
+    """
+    Import EMI payments: loan_id, installment and paid_date, with optional
+    due_date (default: the loan's start_date plus `installment` months) and
+    amount (default: the loan's EMI). Each installment is recorded once;
+    repeats within the file or of stored payments are reported as errors.
+
+    Each chunk is one transaction that locks its loans, inserts the payments
+    with bulk_create, and adds the new on-time EMIs to emis_paid_on_time
+    (capped at tenure) and to the exposure ledger, without reading earlier
+    payments. progress works as in import_customers.
+    """
+    result = ImportResult()
+    offset = 0
+    for chunk in read_chunks(file, name, chunk_size):
+        _require_columns(chunk, PAYMENT_COLUMNS)
+        rows = _row_numbers(offset, len(chunk))
+        offset += len(chunk)
+
+        check = ChunkValidator(chunk)
+        loan_ids = check.integer('loan_id', minimum=1)
+        installments = check.integer('installment', minimum=1, maximum=360)
+        paid_dates = pd.to_datetime(chunk['paid_date'], errors='coerce')
+        check.flag(paid_dates.isna(), "paid_date must be a valid date")
+        due_dates = None
+        if 'due_date' in chunk:
+            due_dates = pd.to_datetime(chunk['due_date'], errors='coerce')
+            check.flag(due_dates.isna() & chunk['due_date'].notna(), "due_date is not a valid date")
+        amounts = None
+        if 'amount' in chunk:
+            amounts = pd.to_numeric(chunk['amount'], errors='coerce').to_numpy(dtype=float)
+            check.flag(amounts <= 0, "amount must be positive")
+
+        with transaction.atomic():
+            # Locked so concurrent imports for the same loans apply one after the other
+            loans = pd.DataFrame.from_records(
+                Loan.objects.select_for_update()
+                .filter(loan_id__in=np.unique(loan_ids[check.valid]).tolist())
+                .values_list('loan_id', 'customer_id', 'tenure', 'start_date', 'monthly_payment', 'emis_paid_on_time'),
+                columns=['loan_id', 'customer_id', 'tenure', 'start_date', 'monthly_payment', 'emis_paid_on_time'],
+                index='loan_id',
+            )
+            per_row = loans.reindex(loan_ids)
+            check.flag(per_row['tenure'].isna().to_numpy(), "Loan not found")
+            check.flag(installments > per_row['tenure'].fillna(0).to_numpy(), "installment is past the loan's tenure")
+
+            keys = loan_ids * INSTALLMENT_KEY_BASE + installments
+            # Among rows still valid, so a file can repeat a rejected row corrected
+            candidates = np.flatnonzero(check.valid)
+            repeated = np.zeros(len(keys), dtype=bool)
+            repeated[candidates] = True
+            repeated[candidates[np.unique(keys[candidates], return_index=True)[1]]] = False
+            check.flag(repeated, "installment appears more than once in the file")
+            # Only the installment numbers this chunk records, not every earlier payment of its loans
+            stored = np.fromiter(
+                (loan_id * INSTALLMENT_KEY_BASE + installment for loan_id, installment in
+                 Payment.objects.filter(
+                     loan_id__in=loans.index.tolist(),
+                     installment__in=np.unique(installments[check.valid]).tolist(),
+                 ).values_list('loan_id', 'installment')),
+                dtype=np.int64,
+            )
+            check.flag(np.isin(keys, stored), "installment is already recorded")
+
+            valid = check.valid
+            result.add_errors(rows[~valid], check.problems[~valid])
+            if valid.any():
+                loans_paid = per_row[valid]
+                if due_dates is None:
+                    due = finance.add_months(loans_paid['start_date'], installments[valid])
+                else:
+                    due = np.where(
+                        due_dates.notna().to_numpy()[valid],
+                        due_dates.dt.date.to_numpy()[valid],
+                        finance.add_months(loans_paid['start_date'], installments[valid]),
+                    )
+                paid = paid_dates.dt.date.to_numpy()[valid]
+                on_time = paid <= due
+                if amounts is None:
+                    amount = loans_paid['monthly_payment'].to_numpy()
+                else:
+                    amount = np.where(np.isnan(amounts[valid]), loans_paid['monthly_payment'].to_numpy(), amounts[valid])
+                Payment.objects.bulk_create(
+                    [
+                        Payment(
+                            loan_id=int(loan_id), installment=int(installment), due_date=due_date,
+                            paid_date=paid_date, amount=float(value), on_time=bool(is_on_time),
+                        )
+                        for loan_id, installment, due_date, paid_date, value, is_on_time in zip(
+                            loan_ids[valid], installments[valid], due, paid, amount, on_time,
+                        )
+                    ],
+                    batch_size=5000,
+                )
+                _apply_on_time_payments(loans, pd.Series(on_time, index=loan_ids[valid]))
+            result.created += int(valid.sum())
+        result.tick()
+        if progress:
+            progress(result)
+    return result
+
+
+def _apply_on_time_payments(loans, on_time):
+    """
+    Add on-time payments (a boolean Series indexed by loan_id) to the loans'
+    counters and the exposure ledger; loans is the locked loan frame
+    """
+    new = on_time.groupby(level=0).sum()
+    new = new[new > 0]
+    if new.empty:
+        return
+    loans = loans.loc[new.index]
+    before = loans['emis_paid_on_time'].to_numpy()
+    tenure = loans['tenure'].to_numpy()
+    after = np.minimum(before + new.to_numpy(), tenure)
+    changed = after != before
+    if not changed.any():
+        return
+    # One UPDATE per distinct number of new payments, rather than a CASE per loan
+    now = timezone.now()
+    for count, loan_ids in new[changed].groupby(new[changed]).groups.items():
+        Loan.objects.filter(loan_id__in=loan_ids.tolist()).update(
+            emis_paid_on_time=Least(F('emis_paid_on_time') + int(count), F('tenure')),
+            updated_at=now,
+        )
+    changes = pd.DataFrame({
+        'customer_id': loans['customer_id'].to_numpy(),
+        'paid': after - before,
+        'completed': (before < tenure) & (after >= tenure),
+    })[changed].groupby('customer_id').sum()
+    CustomerExposure.add_payments({
+        int(customer_id): (int(row.paid), int(row.completed)) for customer_id, row in changes.iterrows()
+    })
+
+
+IMPORTERS = {
+    'customers': import_customers,
+    'loans': import_loans,
+    'payments': import_payments,
+}
@@ -0,0 +1,144 @@
+"""
+Background processing of ImportJob rows.
+
+Uploads are spooled to default_storage and a job row is created. Jobs run
+either on an in-process thread pool (IMPORT_JOBS_RUN_IN_PROCESS) or in a
+separate `manage.py process_import_jobs` worker; both claim jobs through the
+same pending -> running status transition, so a job never runs twice.
+
+A running job reports progress after every chunk. One that has not
+reported for IMPORT_JOB_STALE_MINUTES belonged to a worker that crashed or
+was restarted; fail_stale_jobs() marks it failed rather than running it
+again, since the chunks it committed are already imported. Spooled uploads
+are deleted once their job finishes either way.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingest import IMPORTERS
+from .models import ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Jobs this process was running before a restart will not report again
+        fail_stale_jobs()
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMPORT_JOB_WORKERS,
+            thread_name_prefix='import-job',
+        )
+    return _executor
+
+
+def enqueue_upload(kind, uploaded_file):
+    """Spool an uploaded file to storage and create a pending job for it"""
+    path = default_storage.save(f'imports/{kind}/{uploaded_file.name}', uploaded_file)
+    job = ImportJob.objects.create(kind=kind, file_name=uploaded_file.name, file_path=path)
+    if settings.IMPORT_JOBS_RUN_IN_PROCESS:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # Worker threads own their connection; don't leave it open
+        connection.close()
+
+
+def claim_next_job():
+    """Atomically mark the oldest pending job as running and return it"""
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.STATUS_PENDING)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def run_job(job_id):
+    """Claim and process one pending job; returns False if someone else has it"""
+    now = timezone.now()
+    claimed = ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_PENDING).update(
+        status=ImportJob.STATUS_RUNNING, started_at=now, heartbeat_at=now,
+    )
+    if not claimed:
+        return False
+    process_job(ImportJob.objects.get(pk=job_id))
+    return True
+
+
+def process_job(job):
+    """Run the importer for a job that is already marked running"""
+    def report(result):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=result.rows_processed,
+            rows_created=result.created,
+            rows_failed=result.failed,
+            rows_per_second=round(result.rows_per_second, 1),
+            errors=result.errors,
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        with default_storage.open(job.file_path, 'rb') as file:
+            IMPORTERS[job.kind](file, job.file_name, progress=report)
+    except Exception as e:
+        logger.exception("Import job %s failed", job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now(),
+        )
+    else:
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.STATUS_COMPLETED, finished_at=timezone.now(),
+        )
+    finally:
+        delete_spooled(job.file_path)
+
+
+def delete_spooled(path):
+    try:
+        default_storage.delete(path)
+    except OSError:
+        logger.warning("Could not delete spooled upload %s", path, exc_info=True)
+
+
+def fail_stale_jobs():
+    """Mark running jobs whose worker stopped reporting as failed; returns them"""
+    cutoff = timezone.now() - timedelta(minutes=settings.IMPORT_JOB_STALE_MINUTES)
+    with transaction.atomic():
+        stale = list(
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.STATUS_RUNNING)
+            .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+        )
+        ImportJob.objects.filter(pk__in=[job.pk for job in stale]).update(
+            status=ImportJob.STATUS_FAILED,
+            error="The worker stopped before the job finished; rows already imported were kept",
+            finished_at=timezone.now(),
+        )
+    for job in stale:
+        logger.warning("Import job %s stopped reporting progress; marked failed", job.pk)
+        delete_spooled(job.file_path)
+    return stale
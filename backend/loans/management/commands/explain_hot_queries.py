@@ -0,0 +1,114 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from loans.credit import with_credit_profile
+from loans.models import Customer, ImportJob, Loan
+from loans.search import search_customers
+from loans.synthetic import seed_portfolio
+from loans.views import filter_loans
+
+
+PAGE = 20
+
+# Postgres: "Seq Scan on loans"; SQLite: "SCAN loans" without an index
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+def hot_queries():
+    """The page queries each endpoint runs, built the same way the views build them"""
+    customer_id = Customer.objects.order_by('customer_id').values_list('customer_id', flat=True).first() or 0
+    loan_id = Loan.objects.order_by('loan_id').values_list('loan_id', flat=True).first() or 0
+    newest = Loan.objects.order_by('-created_at').values_list('created_at', flat=True).first()
+    loans = Loan.objects.select_related('customer').order_by('-created_at')
+
+    queries = [
+        ('loan_list', loans[:PAGE]),
+        ('loan_list?customer_id', filter_loans(loans, QueryDict(f'customer_id={customer_id}'))[:PAGE]),
+        ('loan_list?status=active', filter_loans(loans, QueryDict('status=active'))[:PAGE]),
+        ('loan_list?status=completed', filter_loans(loans, QueryDict('status=completed'))[:PAGE]),
+        ('loan_list?pagination=cursor', Loan.objects.select_related('customer')
+            .filter(created_at__lt=newest or timezone.now()).order_by('-created_at', '-pk')[:PAGE]),
+        ('view_loans_by_customer', Loan.objects.filter(customer_id=customer_id).order_by('-created_at')),
+        ('view_loan_by_id', Loan.objects.select_related('customer').filter(loan_id=loan_id)),
+        ('customer_list', Customer.objects.order_by('-created_at')[:PAGE]),
+        ('check_eligibility', with_credit_profile(Customer.objects.filter(customer_id=customer_id))),
+        ('import_job_claim', ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at')[:1]),
+    ]
+    return queries
+
+
+def search_queries():
+    """
+    Customer search, with the indexes its plan must use. SQLite's LIKE can't
+    use either kind, so these are only checked on PostgreSQL.
+    """
+    customers = Customer.objects.order_by('-created_at')
+    return [
+        ('customer_list?search=<phone>', search_customers(customers, '98765')[:PAGE],
+         ['customers_phone_digits_idx']),
+        ('customer_list?search=<name>', search_customers(customers, 'sharma')[:PAGE],
+         ['customers_first_name_upper_trgm_idx', 'customers_last_name_upper_trgm_idx']),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot endpoint queries and fail if any plan falls back to a "
+        "sequential scan or, for customer search, skips its index. Use --customers to seed a large synthetic dataset first "
+        "(rolled back afterwards unless --keep is given)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=0, help="Synthetic customers to seed first")
+        parser.add_argument('--loans-per-customer', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help="Commit the seeded data")
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Unsupported database backend: {connection.vendor}")
+
+        with transaction.atomic():
+            if options['customers']:
+                customers, loans = seed_portfolio(options['customers'], options['loans_per_customer'])
+                self.stdout.write(f"Seeded {customers} customers and {loans} loans")
+            # Fresh statistics so the planner sees the real table sizes. SQLite is
+            # only used for test runs, and with ANALYZE statistics its planner
+            # costs joins without the LIMIT, so it keeps its default heuristics.
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            queries = [(name, queryset, []) for name, queryset in hot_queries()]
+            if connection.vendor == 'postgresql':
+                queries += search_queries()
+
+            failures = []
+            for name, queryset, indexes in queries:
+                plan = queryset.explain()
+                scans = sorted(set(pattern.findall(plan)))
+                unused = [index for index in indexes if index not in plan]
+                if scans:
+                    verdict = self.style.ERROR(f"SEQ SCAN on {', '.join(scans)}")
+                elif unused:
+                    verdict = self.style.ERROR(f"does not use {', '.join(unused)}")
+                else:
+                    verdict = self.style.SUCCESS("ok")
+                self.stdout.write(f"{name}: {verdict}")
+                if options['verbosity'] > 1 or scans or unused:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                if scans or unused:
+                    failures.append(name)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Sequential scans or unused indexes in: {', '.join(failures)}")
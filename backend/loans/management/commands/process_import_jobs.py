@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from loans.jobs import claim_next_job, fail_stale_jobs, process_job
+
+
+class Command(BaseCommand):
+    help = "Process pending import jobs (run as a background worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when no jobs are pending")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between polls when idle")
+
+    def handle(self, *args, **options):
+        for job in fail_stale_jobs():
+            self.stdout.write(f"Job {job.pk} stopped reporting progress and was marked failed")
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            self.stdout.write(f"Processing import job {job.pk} ({job.kind}: {job.file_name})")
+            process_job(job)
+            job.refresh_from_db()
+            self.stdout.write(
+                f"Job {job.pk} {job.status}: {job.rows_created} created, "
+                f"{job.rows_failed} failed, {job.rows_per_second} rows/s"
+            )
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from loans.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete create-loan idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(
+            f"Deleted {deleted} idempotency keys older than {settings.IDEMPOTENCY_KEY_TTL_HOURS} hours"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.models import Customer, CustomerExposure
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-customer exposure ledger from the loans table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report customers whose exposure row is missing or out of date",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['check']
+        checked = drifted = 0
+        last_id = 0
+
+        # Walk customers in primary-key order so memory stays flat
+        while True:
+            customer_ids = list(
+                Customer.objects.filter(customer_id__gt=last_id)
+                .order_by('customer_id')
+                .values_list('customer_id', flat=True)[:batch_size]
+            )
+            if not customer_ids:
+                break
+            stale = CustomerExposure.find_drift(customer_ids)
+            if stale and not dry_run:
+                CustomerExposure.rebuild(stale)
+            drifted += len(stale)
+            checked += len(customer_ids)
+            last_id = customer_ids[-1]
+
+        action = "out of date" if dry_run else "repaired"
+        self.stdout.write(f"Checked {checked} customers, {drifted} exposure rows {action}")
+        if dry_run and drifted:
+            raise CommandError("Exposure ledger does not match the loans table")
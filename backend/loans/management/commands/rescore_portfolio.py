@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from loans.models import RescoreRun
+from loans.rescore import CHUNK_SIZE, rescore, score_changes, start_run
+
+
+class Command(BaseCommand):
+    help = (
+        "Score every customer under the active credit policy into credit_score_snapshots, "
+        "across a process pool. Re-running an unfinished run resumes from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('label', help="Name of the run, e.g. policy-v3")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--restart', action='store_true', help="Discard the run's scores and start over")
+        parser.add_argument('--compare', metavar='LABEL', help="Report score changes against an earlier run")
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be at least 1")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = RescoreRun.objects.get(label=options['compare'])
+            except RescoreRun.DoesNotExist:
+                raise CommandError(f"No rescore run called {options['compare']!r}")
+
+        run = start_run(options['label'], restart=options['restart'])
+        if run.finished_at is not None:
+            self.stdout.write(f"{run} already finished with {run.customers_scored} customers; use --restart to redo it")
+        else:
+            if run.checkpoint:
+                self.stdout.write(f"Resuming {run} after customer {run.checkpoint}")
+            last_report = time.perf_counter()
+
+            def progress(scored, seconds):
+                nonlocal last_report
+                if time.perf_counter() - last_report >= 5:
+                    last_report = time.perf_counter()
+                    self.stdout.write(
+                        f"  {scored} customers, {scored / seconds:.0f}/s, checkpoint {run.checkpoint}"
+                    )
+
+            scored, seconds = rescore(
+                run, workers=options['workers'], chunk_size=options['chunk_size'], progress=progress,
+            )
+            rate = scored / seconds if seconds else 0
+            self.stdout.write(
+                f"Scored {scored} customers in {seconds:.1f}s ({rate:.0f} customers/s) "
+                f"with policy version {run.policy_version}"
+            )
+
+        if baseline is not None:
+            up = down = same = new = 0
+            for (before, after), customers in score_changes(run, baseline).items():
+                if before is None:
+                    new += customers
+                elif after > before:
+                    up += customers
+                elif after < before:
+                    down += customers
+                else:
+                    same += customers
+            self.stdout.write(
+                f"Against {baseline.label}: {up} scores up, {down} down, {same} unchanged, "
+                f"{new} not in {baseline.label}"
+            )
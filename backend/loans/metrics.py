@@ -0,0 +1,259 @@
+"""
+In-process request metrics, exported in the Prometheus text format.
+
+RequestMetricsMiddleware records for every request, labelled by the URL
+name it resolved to: wall time, number of DB queries and time spent in
+them, time spent in serializers that use TimedSerializerMixin, and response
+size. Queries are timed by an execute wrapper that loans/signals.py adds to
+every database connection as it is opened; it reports to the current
+request through a context variable, which also follows async views into
+the threads their ORM calls run in. Histograms are per process;
+scrape each worker, or aggregate in Prometheus.
+
+With SLOW_REQUEST_THRESHOLD_MS set, the SQL of each request is kept and
+logged to the 'loans.slow_requests' logger when the request is slower than
+the threshold.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.fields import empty
+
+
+logger = logging.getLogger('loans.slow_requests')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+MAX_CAPTURED_QUERIES = 200
+
+
+class Histogram:
+    """Prometheus-style histogram with one series per label value"""
+
+    def __init__(self, name, help_text, buckets, label='view'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {label: (list(counts), total) for label, (counts, total) in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_value, (counts, total) in sorted(self.snapshot().items()):
+            labels = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'loans_request_duration_seconds', 'Wall time from middleware entry to response', DURATION_BUCKETS)
+DB_QUERIES = Histogram(
+    'loans_request_db_queries', 'Database queries per request', QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram(
+    'loans_request_db_duration_seconds', 'Time spent in database queries per request', DURATION_BUCKETS)
+SERIALIZER_DURATION = Histogram(
+    'loans_request_serializer_duration_seconds', 'Time spent in serializers per request', DURATION_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'loans_response_size_bytes', 'Response body size', SIZE_BUCKETS)
+
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, RESPONSE_SIZE]
+
+
+class RequestRecord:
+    """What one request spent its time on"""
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.captured_sql = [] if capture_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if self.captured_sql is not None and len(self.captured_sql) < MAX_CAPTURED_QUERIES:
+                self.captured_sql.append((elapsed, sql))
+
+
+current_record = contextvars.ContextVar('loans_request_record', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper) reporting to the current request, if any"""
+    record = current_record.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record(execute, sql, params, many, context)
+
+
+def instrument_connection(connection):
+    # Installed for the connection's lifetime rather than per request: async
+    # views run their queries on other threads, with their own connections
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Adds a serializer's validation and rendering time to the current request's
+    metrics. Nested and list serializers are only counted once.
+    """
+
+    def _timed(self, method, *args):
+        record = current_record.get()
+        if record is None or record.serializer_depth:
+            return method(*args)
+        record.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record.serializer_time += time.perf_counter() - start
+            record.serializer_depth -= 1
+
+    def to_representation(self, instance):
+        return self._timed(super().to_representation, instance)
+
+    def run_validation(self, data=empty):
+        return self._timed(super().run_validation, data)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-view request metrics; install first so all middleware time is
+    included. Works in sync and async stacks, so async views under ASGI stay
+    on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        record, token, start = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_record.reset(token)
+        return self.finish(request, response, record, start)
+
+    async def __acall__(self, request):
+        record, token, start = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_record.reset(token)
+        return self.finish(request, response, record, start)
+
+    @staticmethod
+    def begin():
+        record = RequestRecord(capture_sql=bool(settings.SLOW_REQUEST_THRESHOLD_MS))
+        return record, current_record.set(record), time.perf_counter()
+
+    def finish(self, request, response, record, start):
+        elapsed = time.perf_counter() - start
+        view = view_label(request)
+        REQUEST_DURATION.observe(view, elapsed)
+        DB_QUERIES.observe(view, record.queries)
+        DB_DURATION.observe(view, record.db_time)
+        SERIALIZER_DURATION.observe(view, record.serializer_time)
+        if response.streaming:
+            # Streamed bodies are measured as they are sent; their query time
+            # happens after this point and is not attributed
+            count = self.acount_streamed if response.is_async else self.count_streamed
+            response.streaming_content = count(view, response.streaming_content)
+        else:
+            RESPONSE_SIZE.observe(view, len(response.content))
+
+        threshold_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold_ms and elapsed * 1000 >= threshold_ms:
+            self.log_slow_request(request, view, elapsed, record)
+        return response
+
+    @staticmethod
+    def count_streamed(view, content):
+        size = 0
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+        RESPONSE_SIZE.observe(view, size)
+
+    @staticmethod
+    async def acount_streamed(view, content):
+        size = 0
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+        RESPONSE_SIZE.observe(view, size)
+
+    @staticmethod
+    def log_slow_request(request, view, elapsed, record):
+        statements = '\n'.join(f'  {duration * 1000:.1f}ms {sql}' for duration, sql in record.captured_sql)
+        logger.warning(
+            "Slow request %s %s (%s): %.1fms, %d queries in %.1fms, serializers %.1fms\n%s",
+            request.method, request.path, view, elapsed * 1000, record.queries,
+            record.db_time * 1000, record.serializer_time * 1000, statements,
+        )
+
+
+def render_prometheus(extra=()):
+    """
+    All histograms, plus (name, type, help, value) samples such as counters
+    kept elsewhere, in Prometheus text format
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, metric_type, help_text, value in extra:
+        lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name} {value}'])
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
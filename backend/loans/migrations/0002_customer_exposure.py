@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Seed the ledger for existing customers in one set-based statement
+BACKFILL_EXPOSURES = """
+INSERT INTO customer_exposures
+    (customer_id, total_principal, total_emis, emis_paid_on_time, active_loan_count, updated_at)
+SELECT c.customer_id,
+       COALESCE(SUM(l.loan_amount), 0),
+       COALESCE(SUM(l.tenure), 0),
+       COALESCE(SUM(l.emis_paid_on_time), 0),
+       COALESCE(SUM(CASE WHEN l.emis_paid_on_time < l.tenure THEN 1 ELSE 0 END), 0),
+       CURRENT_TIMESTAMP
+FROM customers c
+LEFT JOIN loans l ON l.customer_id = c.customer_id
+GROUP BY c.customer_id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerExposure',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='exposure', serialize=False, to='loans.customer')),
+                ('total_principal', models.BigIntegerField(default=0, help_text='Sum of loan_amount over all loans')),
+                ('total_emis', models.IntegerField(default=0, help_text='Sum of tenure over all loans')),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('active_loan_count', models.IntegerField(default=0, help_text='Loans with EMIs still outstanding')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'customer_exposures',
+            },
+        ),
+        migrations.RunSQL(BACKFILL_EXPOSURES, migrations.RunSQL.noop),
+    ]
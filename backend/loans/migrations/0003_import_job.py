@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_customer_exposure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customers', 'Customers'), ('loans', 'Loans')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('file_name', models.CharField(help_text='Original name of the uploaded file', max_length=255)),
+                ('file_path', models.CharField(help_text='Storage path of the spooled upload', max_length=500)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('rows_created', models.IntegerField(default=0)),
+                ('rows_failed', models.IntegerField(default=0)),
+                ('rows_per_second', models.FloatField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text='Per-row errors (capped)')),
+                ('error', models.TextField(blank=True, help_text='Reason the whole job failed')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'import_jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+TRIGRAM_INDEXES = {
+    'customers_first_name_trgm_idx': 'first_name',
+    'customers_last_name_trgm_idx': 'last_name',
+}
+
+
+def backfill_phone_digits(apps, schema_editor):
+    from loans.models import normalize_phone
+
+    Customer = apps.get_model('loans', 'Customer')
+    batch = []
+    for customer in Customer.objects.only('customer_id', 'phone_number').iterator(chunk_size=5000):
+        customer.phone_digits = normalize_phone(customer.phone_number)
+        batch.append(customer)
+        if len(batch) == 5000:
+            Customer.objects.bulk_update(batch, ['phone_digits'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['phone_digits'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Name search is a '%term%' substring match; only pg_trgm can index that.
+    # Other databases (SQLite in tests) keep scanning. 0014 replaces these
+    # with indexes on UPPER(column), which is what icontains compares.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON customers USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, help_text='normalize_phone(phone_number), for search', max_length=15),
+        ),
+        migrations.RunPython(backfill_phone_digits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_digits'], name='customers_phone_digits_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
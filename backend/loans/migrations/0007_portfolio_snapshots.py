@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_customer_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('loans_started', models.IntegerField(default=0)),
+                ('amount_started', models.BigIntegerField(default=0, help_text='Sum of loan_amount')),
+                ('emi_started', models.FloatField(default=0, help_text='Sum of monthly_payment')),
+                ('loans_matured', models.IntegerField(default=0)),
+                ('amount_matured', models.BigIntegerField(default=0)),
+                ('emi_matured', models.FloatField(default=0)),
+                ('emis_total', models.IntegerField(default=0, help_text='Sum of tenure of loans started this day')),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('score_buckets', models.JSONField(default=list, help_text='Loans started this day per payment score, 1 to 10')),
+                ('stale', models.BooleanField(default=False, help_text='A loan counted here was deleted; rebuild this day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'portfolio_snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full', models.BooleanField(default=False)),
+                ('watermark', models.DateTimeField(help_text='Loans updated up to this time are reflected')),
+                ('days_rebuilt', models.IntegerField(default=0)),
+                ('loans_scanned', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'snapshot_builds',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['updated_at'], name='loans_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['start_date'], name='loans_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfoliosnapshot',
+            index=models.Index(condition=models.Q(('stale', True)), fields=['date'], name='portfolio_snapshots_stale_idx'),
+        ),
+    ]
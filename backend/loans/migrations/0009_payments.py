@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0008_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='kind',
+            field=models.CharField(choices=[('customers', 'Customers'), ('loans', 'Loans'), ('payments', 'Payments')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('installment', models.PositiveSmallIntegerField(help_text="EMI number, 1 to the loan's tenure")),
+                ('due_date', models.DateField()),
+                ('paid_date', models.DateField()),
+                ('amount', models.FloatField()),
+                ('on_time', models.BooleanField(help_text='Paid on or before the due date')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='loans.loan')),
+            ],
+            options={
+                'db_table': 'payments',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('loan', 'installment'), name='payments_loan_installment_uniq'),
+        ),
+    ]
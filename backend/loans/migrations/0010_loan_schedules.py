@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0009_payments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanSchedule',
+            fields=[
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='schedule', serialize=False, to='loans.loan')),
+                ('terms', models.CharField(max_length=32)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'loan_schedules',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:33
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0010_loan_schedules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditPolicy',
+            fields=[
+                ('version', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('score_bands', models.JSONField(help_text='[[minimum % of EMIs paid on time, credit score], ...]; scores are 1 to 10')),
+                ('lowest_score', models.PositiveSmallIntegerField(default=1, help_text='Score below the lowest band', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('new_customer_score', models.PositiveSmallIntegerField(default=10, help_text='Score of a customer with no EMIs yet', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('approval_tiers', models.JSONField(help_text='[[minimum credit score, fraction of requested amount, interest rate add-on], ...]')),
+                ('rejected_rate_addon', models.FloatField(default=6)),
+                ('max_interest_rate', models.FloatField(default=50.0, help_text='Cap on the suggested interest rate')),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'credit policies',
+                'db_table': 'credit_policies',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='creditpolicy',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='credit_policies_one_active'),
+        ),
+    ]
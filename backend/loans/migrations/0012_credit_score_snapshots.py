@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0011_credit_policies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RescoreRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+                ('policy_version', models.IntegerField(default=0, help_text='CreditPolicy version; 0 is the built-in default')),
+                ('checkpoint', models.IntegerField(default=0, help_text='Customers up to this customer_id are scored')),
+                ('customers_scored', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'rescore_runs',
+            },
+        ),
+        migrations.CreateModel(
+            name='CreditScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credit_score', models.PositiveSmallIntegerField()),
+                ('total_emis', models.IntegerField()),
+                ('emis_paid_on_time', models.IntegerField()),
+                ('available_limit', models.BigIntegerField(help_text='approved_limit minus outstanding principal')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='loans.customer')),
+                ('run', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='loans.rescorerun')),
+            ],
+            options={
+                'db_table': 'credit_score_snapshots',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='creditscoresnapshot',
+            constraint=models.UniqueConstraint(fields=('run', 'customer'), name='credit_score_snapshots_run_customer_uniq'),
+        ),
+    ]
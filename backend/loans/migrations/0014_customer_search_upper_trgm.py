@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+# icontains compiles to UPPER(column::text) LIKE UPPER('%term%') on
+# PostgreSQL, so the trigram indexes must be on that expression
+OLD_INDEXES = {
+    'customers_first_name_trgm_idx': 'first_name',
+    'customers_last_name_trgm_idx': 'last_name',
+}
+UPPER_INDEXES = {
+    'customers_first_name_upper_trgm_idx': 'first_name',
+    'customers_last_name_upper_trgm_idx': 'last_name',
+}
+
+
+def create_indexes(schema_editor, indexes, expression):
+    for name, column in indexes.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON customers USING gin ({expression.format(column)} gin_trgm_ops)'
+        )
+
+
+def drop_indexes(schema_editor, indexes):
+    for name in indexes:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def index_upper_names(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    create_indexes(schema_editor, UPPER_INDEXES, '(UPPER({}::text))')
+    drop_indexes(schema_editor, OLD_INDEXES)
+
+
+def index_raw_names(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    create_indexes(schema_editor, OLD_INDEXES, '{}')
+    drop_indexes(schema_editor, UPPER_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0013_import_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_upper_names, index_raw_names),
+    ]
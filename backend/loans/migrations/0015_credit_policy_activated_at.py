@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_active_policy(apps, schema_editor):
+    # Earlier activations weren't recorded; the active version has been used
+    CreditPolicy = apps.get_model('loans', 'CreditPolicy')
+    CreditPolicy.objects.filter(is_active=True).update(activated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0014_customer_search_upper_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditpolicy',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, help_text="First activation; the rules can't be edited after it", null=True),
+        ),
+        migrations.RunPython(mark_active_policy, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,29 @@
-from django.db import models
+import re
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.dispatch import Signal
+from django.utils import timezone
 from decimal import Decimal
-import datetime
-from dateutil.relativedelta import relativedelta
+from .finance import calculate_emi, calculate_end_date
+
+
+def normalize_phone(value):
+    """
+    Digits of a phone number without the +91 country code or trunk 0,
+    so '+91-98765 43210', '098765 43210' and '9876543210' all match.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) > 10 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) > 10 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
 
 
 class Customer(models.Model):
@@ -11,6 +32,7 @@ class Customer(models.Model):
     last_name = models.CharField(max_length=100)
     age = models.IntegerField(validators=[MinValueValidator(18), MaxValueValidator(100)])
     phone_number = models.CharField(max_length=15)
+    phone_digits = models.CharField(max_length=15, blank=True, editable=False, help_text="normalize_phone(phone_number), for search")
     monthly_salary = models.IntegerField(validators=[MinValueValidator(1)])
     approved_limit = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -20,18 +42,35 @@ class Customer(models.Model):
         # Calculate approved_limit as monthly_salary * 36
         if not self.approved_limit:
             self.approved_limit = self.monthly_salary * 36
-        super().save(*args, **kwargs)
+        self.phone_digits = normalize_phone(self.phone_number)
+        creating = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating:
+                # Every customer gets an exposure row so limit checks can lock it
+                CustomerExposure.objects.create(customer=self)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} (ID: {self.customer_id})"
 
     class Meta:
         db_table = 'customers'
+        indexes = [
+            # Newest-first listing and keyset pagination
+            models.Index(fields=['-created_at', '-customer_id'], name='customers_created_id_idx'),
+            # Exact and prefix phone lookups (pattern ops so LIKE 'x%' can use it on PostgreSQL)
+            models.Index(fields=['phone_digits'], name='customers_phone_digits_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+
+# Loan fields that feed the per-customer exposure ledger
+EXPOSURE_SOURCE_FIELDS = ('customer_id', 'loan_amount', 'tenure', 'emis_paid_on_time')
 
 
 class Loan(models.Model):
     loan_id = models.AutoField(primary_key=True)
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
+    # Indexed through the (customer, created_at) composite index below
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans', db_index=False)
     loan_amount = models.IntegerField(validators=[MinValueValidator(1)])
     tenure = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(360)], help_text="Tenure in months")
     interest_rate = models.FloatField(validators=[MinValueValidator(0.1), MaxValueValidator(50.0)])
@@ -46,23 +85,34 @@ class Loan(models.Model):
         # Calculate monthly_payment (EMI) using the formula
         # EMI = [P x R x (1+R)^N] / [(1+R)^N-1]
         if not self.monthly_payment:
-            principal = self.loan_amount
-            monthly_rate = self.interest_rate / (12 * 100)  # Convert annual rate to monthly decimal
-            tenure_months = self.tenure
-            
-            if monthly_rate > 0:
-                emi = (principal * monthly_rate * ((1 + monthly_rate) ** tenure_months)) / \
-                      (((1 + monthly_rate) ** tenure_months) - 1)
-            else:
-                emi = principal / tenure_months  # Simple division if rate is 0
-            
-            self.monthly_payment = round(emi, 2)
+            self.monthly_payment = calculate_emi(self.loan_amount, self.interest_rate, self.tenure)
 
         # Calculate end_date if not provided
         if not self.end_date and self.start_date:
-            self.end_date = self.start_date + relativedelta(months=self.tenure)
+            self.end_date = calculate_end_date(self.start_date, self.tenure)
 
-        super().save(*args, **kwargs)
+        # Keep the customer's exposure ledger in step with the loans table
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and self.pk:
+                previous = Loan.objects.filter(pk=self.pk).values(
+                    *EXPOSURE_SOURCE_FIELDS, 'start_date', 'end_date',
+                ).first()
+            super().save(*args, **kwargs)
+            if previous:
+                # Days the loan moved off keep counting it until rebuilt
+                left = {previous['start_date'], previous['end_date']} - {self.start_date, self.end_date}
+                if left:
+                    PortfolioSnapshot.objects.filter(date__in=left).update(stale=True)
+            # A rebuild reads the row just saved, so it already counts this loan
+            if not (previous and CustomerExposure.apply_loan(previous, sign=-1)):
+                CustomerExposure.apply_loan({field: getattr(self, field) for field in EXPOSURE_SOURCE_FIELDS})
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            CustomerExposure.apply_loan({field: getattr(self, field) for field in EXPOSURE_SOURCE_FIELDS}, sign=-1)
+        return result
 
     @property
     def total_amount(self):
@@ -91,3 +141,453 @@ class Loan(models.Model):
 
     class Meta:
         db_table = 'loans'
+        indexes = [
+            # Newest-first listing and keyset pagination
+            models.Index(fields=['-created_at', '-loan_id'], name='loans_created_id_idx'),
+            # A customer's loans, newest first (also serves FK lookups and cascades)
+            models.Index(fields=['customer', '-created_at'], name='loans_customer_created_idx'),
+            # Active/completed status filter
+            models.Index(fields=['end_date'], name='loans_end_date_idx'),
+            # Incremental snapshot builds: loans changed since the last run, and
+            # recomputing the days they start on
+            models.Index(fields=['updated_at'], name='loans_updated_at_idx'),
+            models.Index(fields=['start_date'], name='loans_start_date_idx'),
+        ]
+
+
+# Sent with customer_ids after CustomerExposure.rebuild or add_payments
+# rewrites their rows, which bulk paths use instead of Loan.save/delete
+exposures_rebuilt = Signal()
+
+
+class CustomerExposure(models.Model):
+    """
+    Denormalized per-customer totals over the loans table.
+
+    Loan.save and Loan.delete adjust the row with F-expressions inside the
+    same transaction as the loan write, so limit checks and credit scoring
+    read one row instead of scanning every loan. Writes that bypass the
+    model (bulk_create, queryset update/delete) must call rebuild() for the
+    customers they touch; the rebuild_exposures command reconciles the
+    whole table.
+
+    "Active" means the loan still has unpaid EMIs (emis_paid_on_time < tenure),
+    which unlike end_date only changes when the loan row is written.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='exposure')
+    total_principal = models.BigIntegerField(default=0, help_text="Sum of loan_amount over all loans")
+    total_emis = models.IntegerField(default=0, help_text="Sum of tenure over all loans")
+    emis_paid_on_time = models.IntegerField(default=0)
+    active_loan_count = models.IntegerField(default=0, help_text="Loans with EMIs still outstanding")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def loan_totals():
+        """Aggregates over Loan rows that produce the exposure columns"""
+        return {
+            'total_principal': Coalesce(Sum('loan_amount'), 0),
+            'total_emis': Coalesce(Sum('tenure'), 0),
+            'emis_paid_on_time': Coalesce(Sum('emis_paid_on_time'), 0),
+            'active_loan_count': Count('loan_id', filter=Q(emis_paid_on_time__lt=F('tenure'))),
+        }
+
+    @classmethod
+    def apply_loan(cls, loan, sign=1):
+        """
+        Add (or with sign=-1 remove) one loan's contribution atomically.
+        A missing row is rebuilt from the loans table instead, which already
+        reflects the write; returns True in that case.
+        """
+        active = 1 if loan['emis_paid_on_time'] < loan['tenure'] else 0
+        updated = cls.objects.filter(customer_id=loan['customer_id']).update(
+            total_principal=F('total_principal') + sign * loan['loan_amount'],
+            total_emis=F('total_emis') + sign * loan['tenure'],
+            emis_paid_on_time=F('emis_paid_on_time') + sign * loan['emis_paid_on_time'],
+            active_loan_count=F('active_loan_count') + sign * active,
+        )
+        if not updated:
+            cls.rebuild([loan['customer_id']])
+            return True
+        return False
+
+    @classmethod
+    def rebuild(cls, customer_ids):
+        """
+        Recompute the exposure rows of the given customers from the loans table
+        with one set-based UPDATE, creating any rows that are missing.
+        """
+        missing = Customer.objects.filter(customer_id__in=customer_ids, exposure__isnull=True)
+        cls.objects.bulk_create(
+            [cls(customer_id=customer_id) for customer_id in missing.values_list('customer_id', flat=True)],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        loans = Loan.objects.filter(customer_id=OuterRef('customer_id')).values('customer_id').order_by()
+        cls.objects.filter(customer_id__in=customer_ids).update(**{
+            field: Coalesce(Subquery(loans.annotate(total=aggregate).values('total')), 0)
+            for field, aggregate in cls.loan_totals().items()
+        })
+        exposures_rebuilt.send(sender=cls, customer_ids=customer_ids)
+
+    @classmethod
+    def add_payments(cls, changes):
+        """
+        Apply payment ingestion to the ledger incrementally. changes maps
+        customer_id to (EMIs newly paid on time, loans that became fully paid);
+        the loans themselves must already be updated.
+        """
+        # Grouped by change, so a large import is a handful of UPDATEs
+        customers_by_change = defaultdict(list)
+        for customer_id, change in changes.items():
+            customers_by_change[change].append(customer_id)
+        updated = 0
+        for (paid, completed), customer_ids in customers_by_change.items():
+            updated += cls.objects.filter(customer_id__in=customer_ids).update(
+                emis_paid_on_time=F('emis_paid_on_time') + paid,
+                active_loan_count=F('active_loan_count') - completed,
+            )
+        customer_ids = list(changes)
+        if updated < len(customer_ids):
+            existing = set(cls.objects.filter(customer_id__in=customer_ids).values_list('customer_id', flat=True))
+            cls.rebuild([customer_id for customer_id in customer_ids if customer_id not in existing])
+        exposures_rebuilt.send(sender=cls, customer_ids=customer_ids)
+
+    @classmethod
+    def find_drift(cls, customer_ids):
+        """Return the ids of customers whose exposure row is missing or out of date"""
+        # Aliased so the aggregates cannot clash with Loan.emis_paid_on_time
+        aggregates = {f'agg_{field}': expression for field, expression in cls.loan_totals().items()}
+        totals = {
+            row['customer_id']: {field: row[f'agg_{field}'] for field in cls.loan_totals()}
+            for row in Loan.objects.filter(customer_id__in=customer_ids)
+            .values('customer_id')
+            .annotate(**aggregates)
+            .order_by()
+        }
+        empty = {field: 0 for field in cls.loan_totals()}
+        existing = cls.objects.in_bulk(customer_ids)
+        return [
+            customer_id for customer_id in customer_ids
+            if customer_id not in existing
+            or any(getattr(existing[customer_id], field) != value
+                   for field, value in totals.get(customer_id, empty).items())
+        ]
+
+    @classmethod
+    def lock_for_customer(cls, customer):
+        """
+        Return the customer's exposure row locked with SELECT ... FOR UPDATE.
+        Must be called inside a transaction; concurrent loan creations for the
+        same customer then serialize on this row.
+        """
+        try:
+            return cls.objects.select_for_update().get(customer=customer)
+        except cls.DoesNotExist:
+            cls.rebuild([customer.customer_id])
+            return cls.objects.select_for_update().get(customer=customer)
+
+    def __str__(self):
+        return f"Exposure for customer {self.customer_id}"
+
+    class Meta:
+        db_table = 'customer_exposures'
+
+
+class ImportJob(models.Model):
+    """A customer or loan file queued for background ingestion"""
+    KIND_CUSTOMERS = 'customers'
+    KIND_LOANS = 'loans'
+    KIND_PAYMENTS = 'payments'
+    KIND_CHOICES = [
+        (KIND_CUSTOMERS, 'Customers'),
+        (KIND_LOANS, 'Loans'),
+        (KIND_PAYMENTS, 'Payments'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file_name = models.CharField(max_length=255, help_text="Original name of the uploaded file")
+    file_path = models.CharField(max_length=500, help_text="Storage path of the spooled upload")
+    rows_processed = models.IntegerField(default=0)
+    rows_created = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="Per-row errors (capped)")
+    error = models.TextField(blank=True, help_text="Reason the whole job failed")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress report of the running worker")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import job {self.pk} ({self.kind}, {self.status})"
+
+    class Meta:
+        db_table = 'import_jobs'
+        indexes = [
+            # Workers poll for the oldest pending job; finished jobs stay out of the index
+            models.Index(
+                fields=['created_at'],
+                name='import_jobs_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+
+class Payment(models.Model):
+    """
+    One EMI payment, appended by payment file imports and never updated.
+
+    Ingestion adds each loan's new on-time payments to
+    Loan.emis_paid_on_time and to the customer's exposure row, so credit
+    scoring never reads this table. Imported loans carry their earlier
+    history in that counter only; payment files extend it.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # Indexed through the (loan, installment) unique constraint
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='payments', db_index=False)
+    installment = models.PositiveSmallIntegerField(help_text="EMI number, 1 to the loan's tenure")
+    due_date = models.DateField()
+    paid_date = models.DateField()
+    amount = models.FloatField()
+    on_time = models.BooleanField(help_text="Paid on or before the due date")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payment {self.installment} of loan {self.loan_id}"
+
+    class Meta:
+        db_table = 'payments'
+        constraints = [
+            models.UniqueConstraint(fields=['loan', 'installment'], name='payments_loan_installment_uniq'),
+        ]
+
+
+class LoanSchedule(models.Model):
+    """
+    A loan's amortization schedule, built on first request by
+    loans/schedules.py and stored as one blob rather than a row per month.
+
+    data holds little-endian float64 principal, interest and balance arrays
+    of tenure months each, back to back. terms fingerprints the loan fields
+    the schedule was built from; a schedule whose terms no longer match the
+    loan is stale and is rebuilt on its next read.
+    """
+    loan = models.OneToOneField(Loan, on_delete=models.CASCADE, primary_key=True, related_name='schedule')
+    terms = models.CharField(max_length=32)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Schedule of loan {self.loan_id}"
+
+    class Meta:
+        db_table = 'loan_schedules'
+
+
+class PortfolioSnapshot(models.Model):
+    """
+    Loan flows for one calendar day, maintained by build_portfolio_snapshots.
+
+    Loans are counted on their start_date (started_*, and the repayment
+    record and score mix of that day's cohort) and again on their end_date
+    (matured_*). Point-in-time figures such as outstanding exposure are
+    running sums of started minus matured, so a trend over years reads one
+    row per day and never touches the loans table.
+    """
+    date = models.DateField(primary_key=True)
+    loans_started = models.IntegerField(default=0)
+    amount_started = models.BigIntegerField(default=0, help_text="Sum of loan_amount")
+    emi_started = models.FloatField(default=0, help_text="Sum of monthly_payment")
+    loans_matured = models.IntegerField(default=0)
+    amount_matured = models.BigIntegerField(default=0)
+    emi_matured = models.FloatField(default=0)
+    emis_total = models.IntegerField(default=0, help_text="Sum of tenure of loans started this day")
+    emis_paid_on_time = models.IntegerField(default=0)
+    score_buckets = models.JSONField(default=list, help_text="Loans started this day per payment score, 1 to 10")
+    stale = models.BooleanField(default=False, help_text="A loan counted here was deleted; rebuild this day")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Portfolio snapshot {self.date}"
+
+    class Meta:
+        db_table = 'portfolio_snapshots'
+        indexes = [
+            models.Index(fields=['date'], name='portfolio_snapshots_stale_idx', condition=models.Q(stale=True)),
+        ]
+
+
+class SnapshotBuild(models.Model):
+    """One run of build_portfolio_snapshots; the latest watermark drives the next incremental run"""
+    full = models.BooleanField(default=False)
+    watermark = models.DateTimeField(help_text="Loans updated up to this time are reflected")
+    days_rebuilt = models.IntegerField(default=0)
+    loans_scanned = models.IntegerField(default=0)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Snapshot build {self.pk} up to {self.watermark}"
+
+    class Meta:
+        db_table = 'snapshot_builds'
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a successful POST /api/create-loan, kept under the client's
+    Idempotency-Key so retries replay it instead of creating another loan
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Idempotency key {self.key}"
+
+    class Meta:
+        db_table = 'idempotency_keys'
+
+
+class CreditPolicyQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if set(kwargs) & {'activated_at', *CreditPolicy.RULE_FIELDS} and self.filter(activated_at__isnull=False).exists():
+            raise ValidationError(CreditPolicy.FIXED_RULES_MESSAGE)
+        return super().update(**kwargs)
+
+
+class CreditPolicy(models.Model):
+    """
+    One version of the credit rules: the score ladder and the approval tiers.
+    At most one version is active; without one, the built-in defaults in
+    loans/policy.py apply. Versions are not edited once used: add a new
+    version and activate it, so any score can be traced to the rules that
+    produced it.
+    """
+    version = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, blank=True)
+    score_bands = models.JSONField(
+        help_text="[[minimum % of EMIs paid on time, credit score], ...]; scores are 1 to 10")
+    lowest_score = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(10)],
+        help_text="Score below the lowest band")
+    new_customer_score = models.PositiveSmallIntegerField(
+        default=10, validators=[MinValueValidator(1), MaxValueValidator(10)],
+        help_text="Score of a customer with no EMIs yet")
+    approval_tiers = models.JSONField(
+        help_text="[[minimum credit score, fraction of requested amount, interest rate add-on], ...]")
+    rejected_rate_addon = models.FloatField(default=6)
+    max_interest_rate = models.FloatField(default=50.0, help_text="Cap on the suggested interest rate")
+    is_active = models.BooleanField(default=False)
+    activated_at = models.DateTimeField(
+        null=True, blank=True, help_text="First activation; the rules can't be edited after it")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    RULE_FIELDS = [
+        'score_bands', 'lowest_score', 'new_customer_score', 'approval_tiers',
+        'rejected_rate_addon', 'max_interest_rate',
+    ]
+    FIXED_RULES_MESSAGE = "The rules of a policy that has been activated can't be changed; add a new version"
+
+    objects = CreditPolicyQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Credit policy v{self.version}" + (f" ({self.name})" if self.name else "")
+
+    def clean(self):
+        from .policy import compile_policy
+        try:
+            compile_policy(self)
+        except (TypeError, ValueError) as exc:
+            raise ValidationError(str(exc))
+        if self.changes_fixed_rules():
+            raise ValidationError(self.FIXED_RULES_MESSAGE)
+
+    def save(self, *args, **kwargs):
+        # Scores and rescore runs name a version, so its rules stay as activated
+        if self.changes_fixed_rules():
+            raise ValidationError(self.FIXED_RULES_MESSAGE)
+        super().save(*args, **kwargs)
+
+    def changes_fixed_rules(self):
+        """Whether this instance differs from the stored rules of an activated policy"""
+        if self._state.adding:
+            return False
+        fields = ['activated_at', *self.RULE_FIELDS]
+        stored = CreditPolicy.objects.filter(pk=self.pk).values(*fields).first()
+        if not stored or not stored['activated_at']:
+            return False
+        return any(stored[field] != getattr(self, field) for field in fields)
+
+    def activate(self):
+        """Make this the only active version"""
+        with transaction.atomic():
+            CreditPolicy.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+            self.is_active = True
+            if self.activated_at is None:
+                self.activated_at = timezone.now()
+            self.save()
+
+    class Meta:
+        db_table = 'credit_policies'
+        verbose_name_plural = 'credit policies'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'], condition=Q(is_active=True), name='credit_policies_one_active',
+            ),
+        ]
+
+
+class RescoreRun(models.Model):
+    """
+    One `rescore_portfolio` run: every customer scored under one policy
+    version. Chunks are scored in customer_id order; checkpoint is the
+    highest customer_id below which every chunk is written, and an
+    interrupted run resumes after it.
+    """
+    label = models.CharField(max_length=100, unique=True)
+    policy_version = models.IntegerField(default=0, help_text="CreditPolicy version; 0 is the built-in default")
+    checkpoint = models.IntegerField(default=0, help_text="Customers up to this customer_id are scored")
+    customers_scored = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Rescore run {self.label}"
+
+    class Meta:
+        db_table = 'rescore_runs'
+
+
+class CreditScoreSnapshot(models.Model):
+    """A customer's credit score and its inputs as of one RescoreRun"""
+    run = models.ForeignKey(RescoreRun, on_delete=models.CASCADE, related_name='scores', db_index=False)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    credit_score = models.PositiveSmallIntegerField()
+    total_emis = models.IntegerField()
+    emis_paid_on_time = models.IntegerField()
+    available_limit = models.BigIntegerField(help_text="approved_limit minus outstanding principal")
+
+    def __str__(self):
+        return f"Score of customer {self.customer_id} in run {self.run_id}"
+
+    class Meta:
+        db_table = 'credit_score_snapshots'
+        constraints = [
+            # Also the index for reading a run in customer order
+            models.UniqueConstraint(fields=['run', 'customer'], name='credit_score_snapshots_run_customer_uniq'),
+        ]
@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, pk), newest first. Each page is a
+    range scan on the matching composite index, so deep pages cost the same
+    as the first one and no COUNT(*) is run.
+    """
+    ordering = ('-created_at', '-pk')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OptionalCursorPaginationMixin:
+    """
+    Keep the default page-number pagination, but switch a list view to
+    cursor pagination when the client asks for it with ?pagination=cursor
+    (or follows a link that carries a cursor).
+    """
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def wants_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.wants_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
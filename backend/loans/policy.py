@@ -0,0 +1,227 @@
+"""
+Credit policy: the score ladder and approval tiers, as data.
+
+A CreditPolicy row is compiled once into sorted threshold arrays. A score
+or an approval tier is then a bisect (one application) or a searchsorted
+(a batch), so the scalar and array paths always apply the same rules.
+
+active_policy() keeps the compiled active version in process memory. At
+most every CHECK_INTERVAL seconds it reads the active version number from
+the 'credit' cache alias, and recompiles only when that differs from the
+one held; loans/signals.py drops the key (and, in the saving process, the
+compiled policy) whenever a policy is saved or deleted. A version's rules
+are fixed once it has been activated, so the version number is enough to
+tell other processes when to recompile. On a miss the number costs one query. With the
+per-process locmem backend, other workers pick up a new version within the
+credit cache TIMEOUT.
+"""
+import time
+from bisect import bisect_right
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from . import cache, finance
+from .models import CreditPolicy
+
+
+VERSION_KEY = 'credit-policy-version'
+CHECK_INTERVAL = 1.0
+SCORE_RANGE = range(1, 11)
+
+
+class CompiledPolicy:
+    """A credit policy as sorted arrays; version 0 is the built-in default"""
+
+    def __init__(self, version, score_bands, lowest_score, new_customer_score, approval_tiers,
+                 rejected_rate_addon, max_interest_rate):
+        bands = sorted((float(threshold), int(score)) for threshold, score in score_bands)
+        tiers = sorted((float(min_score), float(fraction), float(rate_addon))
+                       for min_score, fraction, rate_addon in approval_tiers)
+        for score in [lowest_score, new_customer_score] + [score for _, score in bands]:
+            if score not in SCORE_RANGE:
+                raise ValueError(f"Credit scores must be between 1 and 10, got {score}")
+        if len({threshold for threshold, _ in bands}) < len(bands):
+            raise ValueError("Score band thresholds must be distinct")
+        if len({min_score for min_score, _, _ in tiers}) < len(tiers):
+            raise ValueError("Approval tier minimum scores must be distinct")
+        if any(not 0 < fraction <= 1 for _, fraction, _ in tiers):
+            raise ValueError("Approval tier fractions must be above 0 and at most 1")
+
+        self.version = version
+        self.lowest_score = int(lowest_score)
+        self.new_customer_score = int(new_customer_score)
+        self.max_interest_rate = float(max_interest_rate)
+        # (threshold, score), highest band first
+        self.score_bands = bands[::-1]
+        # Index 0 is below the lowest threshold: the lowest score, or rejection
+        self.thresholds = [threshold for threshold, _ in bands]
+        self.band_scores = [self.lowest_score] + [score for _, score in bands]
+        self.tier_scores = [min_score for min_score, _, _ in tiers]
+        self.fractions = [0.0] + [fraction for _, fraction, _ in tiers]
+        self.rate_addons = [float(rejected_rate_addon)] + [rate_addon for _, _, rate_addon in tiers]
+
+        self._thresholds = np.array(self.thresholds, dtype=float)
+        self._band_scores = np.array(self.band_scores)
+        self._tier_scores = np.array(self.tier_scores, dtype=float)
+        self._fractions = np.array(self.fractions)
+        self._rate_addons = np.array(self.rate_addons)
+
+    def score(self, total_emis, total_paid_on_time):
+        """Map EMI payment history onto the 1-10 credit score ladder"""
+        if not total_emis:
+            return self.new_customer_score  # New customer gets highest score initially
+        payment_percentage = (total_paid_on_time / total_emis) * 100
+        return self.band_scores[bisect_right(self.thresholds, payment_percentage)]
+
+    def scores(self, total_emis, total_paid_on_time):
+        """Array version of score"""
+        total_emis = np.asarray(total_emis, dtype=float)
+        total_paid_on_time = np.asarray(total_paid_on_time, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            payment_percentage = (total_paid_on_time / total_emis) * 100
+        band = np.searchsorted(self._thresholds, np.nan_to_num(payment_percentage), side='right')
+        return np.where(total_emis > 0, self._band_scores[band], self.new_customer_score)
+
+    def evaluate(self, credit_score, available_limit, loan_amount, interest_rate, tenure):
+        """Apply the approval tiers to one application"""
+        tier = bisect_right(self.tier_scores, credit_score)
+        if tier:
+            fraction = self.fractions[tier]
+            approved_amount = min(loan_amount * fraction, available_limit)
+            if fraction == 1.0:
+                approval_status = 'approved' if approved_amount >= loan_amount else 'partial'
+            else:
+                approval_status = 'partial' if approved_amount > 0 else 'rejected'
+        else:
+            approved_amount = 0
+            approval_status = 'rejected'
+
+        # Ensure suggested rate doesn't exceed the cap
+        suggested_rate = min(interest_rate + self.rate_addons[tier], self.max_interest_rate)
+        monthly_emi = finance.calculate_emi(approved_amount, suggested_rate, tenure) if approved_amount > 0 else 0
+
+        return {
+            'credit_score': credit_score,
+            'approved_amount': int(approved_amount),
+            'approval_status': approval_status,
+            'suggested_interest_rate': round(suggested_rate, 2),
+            'monthly_emi': monthly_emi,
+        }
+
+    def evaluate_many(self, credit_scores, available_limits, loan_amounts, interest_rates, tenures):
+        """
+        Array version of evaluate. Returns a dict of equal-length arrays
+        keyed like the single-application response.
+        """
+        credit_scores = np.asarray(credit_scores)
+        available_limits = np.asarray(available_limits, dtype=float)
+        loan_amounts = np.asarray(loan_amounts, dtype=float)
+        interest_rates = np.asarray(interest_rates, dtype=float)
+
+        tiers = np.searchsorted(self._tier_scores, credit_scores, side='right')
+        fractions = self._fractions[tiers]
+        offered = tiers > 0
+        amounts = np.minimum(loan_amounts * fractions, available_limits)
+        approved_amounts = np.where(offered, amounts, 0.0)
+        statuses = np.where(
+            offered & (fractions == 1.0),
+            np.where(amounts >= loan_amounts, 'approved', 'partial'),
+            np.where(offered & (amounts > 0), 'partial', 'rejected'),
+        ).astype(object)
+
+        suggested_rates = np.minimum(interest_rates + self._rate_addons[tiers], self.max_interest_rate)
+        monthly_emis = np.where(
+            approved_amounts > 0,
+            finance.emi(approved_amounts, suggested_rates, tenures),
+            0,
+        )
+        return {
+            'credit_score': credit_scores,
+            'approved_amount': np.trunc(approved_amounts).astype(np.int64),
+            'approval_status': statuses,
+            'suggested_interest_rate': np.round(suggested_rates, 2),
+            'monthly_emi': monthly_emis,
+        }
+
+
+DEFAULT_POLICY = CompiledPolicy(
+    version=0,
+    # (minimum % of EMIs paid on time, credit score)
+    score_bands=[(90, 10), (80, 9), (70, 8), (60, 7), (50, 6), (40, 5), (30, 4), (20, 3), (10, 2)],
+    lowest_score=1,
+    new_customer_score=10,
+    # (minimum credit score, fraction of requested amount, interest rate add-on)
+    approval_tiers=[(7, 1.0, 0), (5, 0.8, 2), (3, 0.6, 4)],
+    rejected_rate_addon=6,
+    max_interest_rate=50.0,
+)
+
+
+def compile_policy(policy):
+    """CompiledPolicy of a CreditPolicy row; raises ValueError or TypeError if it is malformed"""
+    return CompiledPolicy(
+        policy.version,
+        policy.score_bands,
+        policy.lowest_score,
+        policy.new_customer_score,
+        policy.approval_tiers,
+        policy.rejected_rate_addon,
+        policy.max_interest_rate,
+    )
+
+
+_compiled = DEFAULT_POLICY
+_checked_at = float('-inf')
+
+
+def active_version():
+    """Version number of the active policy, 0 for the default"""
+    credit_cache = cache.get_cache()
+    version = credit_cache.get(VERSION_KEY)
+    if version is None:
+        version = CreditPolicy.objects.filter(is_active=True).values_list('version', flat=True).first() or 0
+        credit_cache.set(VERSION_KEY, version)
+    return version
+
+
+def load(version):
+    """Compile a policy version from the database"""
+    if not version:
+        return DEFAULT_POLICY
+    return compile_policy(CreditPolicy.objects.get(version=version))
+
+
+def active_policy():
+    """The active policy, compiled"""
+    global _compiled, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return _compiled
+    version = active_version()
+    if _compiled.version != version:
+        _compiled = load(version)
+    _checked_at = now
+    return _compiled
+
+
+async def aactive_policy():
+    """Async version of active_policy"""
+    global _checked_at
+    now = time.monotonic()
+    if now - _checked_at >= CHECK_INTERVAL:
+        if await cache.get_cache().aget(VERSION_KEY) != _compiled.version:
+            return await sync_to_async(active_policy)()
+        _checked_at = now
+    return _compiled
+
+
+def invalidate():
+    """
+    Make the next active_policy() call in any process re-read the active
+    version, and in this one recompile it too
+    """
+    global _compiled, _checked_at
+    cache.get_cache().delete(VERSION_KEY)
+    _compiled = DEFAULT_POLICY
+    _checked_at = float('-inf')
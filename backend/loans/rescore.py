@@ -0,0 +1,174 @@
+"""
+Offline re-scoring of every customer under one credit policy version.
+
+rescore() walks customer_id in keyset chunks of chunk_size. The parent
+process only finds each chunk's upper bound (an index-only query) and
+hands (after, upto] ranges to a process pool; each worker reads its
+customers joined to their exposure rows, scores them with the policy's
+array scorer and upserts CreditScoreSnapshot rows, all on its own database
+connection, so throughput grows with workers until the database saturates.
+
+The run's checkpoint only moves past a chunk once every chunk before it
+is written, so an interrupted run resumes from the checkpoint and at
+worst rewrites the chunks that were in flight. Workers are spawned rather
+than forked so none inherits the parent's open database connection.
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.utils import timezone
+
+from . import policy as credit_policy
+from .credit import with_credit_profile
+from .models import CreditScoreSnapshot, Customer, CustomerExposure, RescoreRun
+
+
+CHUNK_SIZE = 10000
+SNAPSHOT_FIELDS = ['credit_score', 'total_emis', 'emis_paid_on_time', 'available_limit']
+
+# Compiled policies of this worker process, by version
+_policies = {}
+
+
+def get_policy(version):
+    if version not in _policies:
+        _policies[version] = credit_policy.load(version)
+    return _policies[version]
+
+
+def chunk_bounds(after, chunk_size):
+    """Upper customer_id of the chunk of up to chunk_size customers after `after`, None past the end"""
+    customers = Customer.objects.filter(customer_id__gt=after).order_by('customer_id')
+    upto = customers.values_list('customer_id', flat=True)[chunk_size - 1:chunk_size]
+    if upto:
+        return upto[0]
+    return customers.aggregate(last=Max('customer_id'))['last']
+
+
+def score_rows(after, upto):
+    """(customer_id, approved_limit, total_emis, emis_paid_on_time, total_principal) of a chunk"""
+    rows = list(with_credit_profile(
+        Customer.objects.filter(customer_id__gt=after, customer_id__lte=upto)
+    ).values_list(
+        'customer_id', 'approved_limit', 'exposure__total_emis',
+        'exposure__emis_paid_on_time', 'exposure__total_principal',
+    ))
+    # Customers created before the ledger existed
+    missing = [row[0] for row in rows if row[2] is None]
+    if missing:
+        CustomerExposure.rebuild(missing)
+        return score_rows(after, upto)
+    return rows
+
+
+def score_chunk(run_id, policy_version, after, upto):
+    """Score and store customers after < customer_id <= upto; returns how many"""
+    rows = score_rows(after, upto)
+    if not rows:
+        return 0
+    customer_ids, approved_limits, total_emis, paid_on_time, principal = np.array(rows, dtype=np.int64).T
+    scores = get_policy(policy_version).scores(total_emis, paid_on_time)
+    snapshots = [
+        CreditScoreSnapshot(
+            run_id=run_id, customer_id=customer_id, credit_score=score,
+            total_emis=emis, emis_paid_on_time=paid, available_limit=available,
+        )
+        for customer_id, score, emis, paid, available in zip(
+            customer_ids.tolist(), scores.tolist(), total_emis.tolist(), paid_on_time.tolist(),
+            (approved_limits - principal).tolist(),
+        )
+    ]
+    # An upsert, so chunks rewritten after a resume replace their rows
+    CreditScoreSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=['run', 'customer'], update_fields=SNAPSHOT_FIELDS,
+    )
+    return len(snapshots)
+
+
+def start_run(label, restart=False):
+    """The run called label, created with the active policy version if new"""
+    run, created = RescoreRun.objects.get_or_create(
+        label=label, defaults={'policy_version': credit_policy.active_version()},
+    )
+    if restart and not created:
+        run.scores.all().delete()
+        run.policy_version = credit_policy.active_version()
+        run.checkpoint = run.customers_scored = 0
+        run.finished_at = None
+        run.started_at = timezone.now()
+        run.save()
+    return run
+
+
+def advance(run, upto, scored):
+    RescoreRun.objects.filter(pk=run.pk).update(
+        checkpoint=upto, customers_scored=F('customers_scored') + scored,
+    )
+    run.checkpoint = upto
+    run.customers_scored += scored
+
+
+def rescore(run, workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Score every customer after run.checkpoint. workers defaults to the CPU
+    count; with 1 the chunks are scored in this process. progress, if
+    given, is called with (customers scored, seconds) as the checkpoint
+    moves. Returns (customers scored, seconds) for this call.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    scored = 0
+
+    def done(upto, count):
+        nonlocal scored
+        scored += count
+        advance(run, upto, count)
+        if progress:
+            progress(scored, time.perf_counter() - started)
+
+    after = run.checkpoint
+    if workers == 1:
+        while (upto := chunk_bounds(after, chunk_size)) is not None:
+            done(upto, score_chunk(run.pk, run.policy_version, after, upto))
+            after = upto
+    else:
+        context = multiprocessing.get_context('spawn')
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+            while True:
+                upto = chunk_bounds(after, chunk_size)
+                if upto is not None:
+                    pending.append((upto, pool.submit(score_chunk, run.pk, run.policy_version, after, upto)))
+                    after = upto
+                # Keep every worker busy without queueing the whole table
+                while pending and (upto is None or len(pending) >= workers * 2 or pending[0][1].done()):
+                    chunk_end, future = pending.popleft()
+                    done(chunk_end, future.result())
+                if upto is None:
+                    break
+
+    run.finished_at = timezone.now()
+    run.save(update_fields=['finished_at'])
+    return scored, time.perf_counter() - started
+
+
+def score_changes(run, baseline):
+    """
+    {(baseline score, run score): customers} over the customers in run;
+    the baseline score is None for customers baseline did not score
+    """
+    before = CreditScoreSnapshot.objects.filter(run=baseline, customer=OuterRef('customer')).values('credit_score')
+    rows = (
+        CreditScoreSnapshot.objects.filter(run=run)
+        .annotate(before=Subquery(before))
+        .values_list('before', 'credit_score')
+        .annotate(customers=Count('pk'))
+        .order_by()
+    )
+    return {(previous, score): customers for previous, score, customers in rows}
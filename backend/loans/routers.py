@@ -0,0 +1,151 @@
+"""
+Read replica routing (settings.DATABASE_REPLICAS).
+
+ReplicaReadMiddleware picks one replica for each GET, HEAD or OPTIONS
+request, and ReplicaRouter sends that request's reads there, including the
+reads of a streamed response. All writes, and the reads of every other
+request, use 'default'. After a successful request that wrote to the
+database, the client is pinned to 'default' for REPLICA_PIN_SECONDS through a
+cookie, so a new customer or loan can be read back straight away however far
+the replicas lag. Read-only POSTs (eligibility checks, quote grids) don't
+write and so don't pin.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_alias = contextvars.ContextVar('loans_read_alias', default=None)
+
+
+class WriteTracker:
+    """Flags whether the current request routed anything to the primary for writing"""
+    __slots__ = ('wrote',)
+
+    def __init__(self):
+        self.wrote = False
+
+
+# Mutable rather than set per write, so writes made in the threads async
+# views run their ORM calls in are seen by the request's middleware
+request_writes = contextvars.ContextVar('loans_request_writes', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is not None:
+            return alias
+        instance = hints.get('instance')
+        # Related objects of an instance read from a replica come from the same one
+        return instance._state.db if instance is not None else None
+
+    def db_for_write(self, model, **hints):
+        tracker = request_writes.get()
+        if tracker is not None:
+            tracker.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMiddleware:
+    """Chooses the database a request reads from, and pins writers to the primary"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias, tracker = self.choose(request), WriteTracker()
+        tokens = read_alias.set(alias), request_writes.set(tracker)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(request, response, alias, tracker)
+
+    async def __acall__(self, request):
+        alias, tracker = self.choose(request), WriteTracker()
+        tokens = read_alias.set(alias), request_writes.set(tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(request, response, alias, tracker)
+
+    @staticmethod
+    def reset(tokens):
+        alias_token, writes_token = tokens
+        read_alias.reset(alias_token)
+        request_writes.reset(writes_token)
+
+    @staticmethod
+    def choose(request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or request.method not in SAFE_METHODS or request.COOKIES.get(PIN_COOKIE):
+            return None
+        return random.choice(replicas)
+
+    def finish(self, request, response, alias, tracker):
+        if alias is not None and response.streaming:
+            # The body is read after this middleware returns
+            stream = self.astream_from if response.is_async else self.stream_from
+            response.streaming_content = stream(alias, response.streaming_content)
+        if (settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS
+                and tracker.wrote and response.status_code < 400):
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    @staticmethod
+    def stream_from(alias, content):
+        content = iter(content)
+        try:
+            while True:
+                token = read_alias.set(alias)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    read_alias.reset(token)
+                yield chunk
+        finally:
+            # A client that disconnects closes this generator; pass that on
+            if hasattr(content, 'close'):
+                content.close()
+
+    @staticmethod
+    async def astream_from(alias, content):
+        content = content.__aiter__()
+        while True:
+            token = read_alias.set(alias)
+            try:
+                chunk = await content.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                read_alias.reset(token)
+            yield chunk
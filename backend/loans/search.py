@@ -0,0 +1,77 @@
+"""
+Customer search.
+
+A term made only of phone characters (digits, spaces, +, -) is looked up as an
+exact or prefix match on the normalized phone_digits column, which is a
+b-tree range scan. Anything else is split into words and every word has to
+match the first or last name. On PostgreSQL icontains compiles to
+UPPER(column) LIKE UPPER('%word%'), which the pg_trgm GIN indexes on
+UPPER(first_name) and UPPER(last_name) from migration 0014 serve, and
+results are ranked by trigram similarity; other databases (SQLite in tests)
+get the same filter with a simple exact > prefix > substring rank.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import normalize_phone
+
+
+PHONE_TERM = re.compile(r'^\+?[\d\s\-()]+$')
+NAME_FIELDS = ('first_name', 'last_name')
+
+
+def phone_prefix(term):
+    """
+    Digits to prefix-match against phone_digits. Partial numbers are too
+    short for normalize_phone to spot a prefix, so an explicit +91 and any
+    trunk 0 are dropped here.
+    """
+    digits = re.sub(r'\D', '', term)
+    if term.startswith('+91'):
+        digits = digits[2:]
+    return normalize_phone(digits).lstrip('0')
+
+
+def name_filter(words):
+    condition = Q()
+    for word in words:
+        condition &= Q(first_name__icontains=word) | Q(last_name__icontains=word)
+    return condition
+
+
+def name_rank(term, words):
+    """Relevance expression for ordering name matches, highest first"""
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        return Greatest(*(TrigramSimilarity(field, term) for field in NAME_FIELDS))
+
+    whens = []
+    for field in NAME_FIELDS:
+        whens.append(When(**{f'{field}__iexact': words[0]}, then=Value(3)))
+    for field in NAME_FIELDS:
+        whens.append(When(**{f'{field}__istartswith': words[0]}, then=Value(2)))
+    return Case(*whens, default=Value(1), output_field=IntegerField())
+
+
+def search_customers(queryset, term, rank=True):
+    """
+    Filter a Customer queryset by a free-text search term. With rank=True
+    the result is ordered by relevance, then newest first.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    if PHONE_TERM.match(term) and phone_prefix(term):
+        return queryset.filter(phone_digits__startswith=phone_prefix(term))
+
+    words = term.split()
+    queryset = queryset.filter(name_filter(words))
+    if rank:
+        queryset = queryset.annotate(search_rank=name_rank(term, words)).order_by(
+            '-search_rank', '-created_at', '-customer_id'
+        )
+    return queryset
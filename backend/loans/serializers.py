@@ -1,9 +1,14 @@
+import math
+
+from django.conf import settings
 from rest_framework import serializers
-from .models import Customer, Loan
+from .models import Customer, CustomerExposure, ImportJob, Loan
+from .credit import get_credit_profile
+from .metrics import TimedSerializerMixin
 from datetime import date
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['customer_id', 'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit']
@@ -20,7 +25,7 @@ class CustomerSerializer(serializers.ModelSerializer):
         return value
 
 
-class LoanSerializer(serializers.ModelSerializer):
+class LoanSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     customer_name = serializers.SerializerMethodField()
     total_amount = serializers.ReadOnlyField()
     total_interest = serializers.ReadOnlyField()
@@ -63,21 +68,92 @@ class LoanDetailSerializer(LoanSerializer):
         fields = LoanSerializer.Meta.fields + ['customer_details']
 
 
-class EligibilityCheckSerializer(serializers.Serializer):
+class EligibilityRequestSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Shape of an eligibility request, checked without touching the database"""
     customer_id = serializers.IntegerField()
     loan_amount = serializers.IntegerField(min_value=1)
     interest_rate = serializers.FloatField(min_value=0.1, max_value=50.0)
     tenure = serializers.IntegerField(min_value=1, max_value=360)
 
+
+class EligibilityCheckSerializer(EligibilityRequestSerializer):
+
     def validate_customer_id(self, value):
+        # Keep the profile so the view can score without querying again
         try:
-            Customer.objects.get(customer_id=value)
+            self.credit_profile = get_credit_profile(value)
         except Customer.DoesNotExist:
             raise serializers.ValidationError("Customer does not exist.")
         return value
 
 
-class EligibilityResponseSerializer(serializers.Serializer):
+class GridAxisField(serializers.Field):
+    """
+    One axis of a quote grid: a list of values, or {"min", "max", "step"}
+    expanded with max included. Values are validated by `child`, then
+    de-duplicated and sorted.
+    """
+    default_error_messages = {
+        'invalid': 'Expected a non-empty list of values or {"min", "max", "step"}.',
+        'invalid_range': 'min, max and step must be numbers with step > 0 and max >= min.',
+        'max_length': 'At most {max_length} values per axis.',
+    }
+
+    def __init__(self, child, max_length=500, **kwargs):
+        super().__init__(**kwargs)
+        self.child = child
+        self.max_length = max_length
+        self.child.bind(field_name='', parent=self)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            try:
+                start, stop, step = (float(data[key]) for key in ('min', 'max', 'step'))
+            except (KeyError, TypeError, ValueError):
+                self.fail('invalid_range')
+            # float() accepts "inf" and "nan"
+            if not all(map(math.isfinite, (start, stop, step))) or step <= 0 or stop < start:
+                self.fail('invalid_range')
+            # Tolerate float steps that land a hair short of max
+            # and a range too wide for a float, which divides out to inf
+            steps = (stop - start) / step + 1e-9
+            if not math.isfinite(steps) or steps >= self.max_length:
+                self.fail('max_length', max_length=self.max_length)
+            count = int(steps) + 1
+            data = [round(start + i * step, 6) for i in range(count)]
+        elif not isinstance(data, list) or not data:
+            self.fail('invalid')
+        if len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length)
+        return sorted({self.child.run_validation(value) for value in data})
+
+    def to_representation(self, value):
+        return value
+
+
+class QuoteGridSerializer(TimedSerializerMixin, serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    loan_amounts = GridAxisField(serializers.IntegerField(min_value=1))
+    tenures = GridAxisField(serializers.IntegerField(min_value=1, max_value=360))
+    interest_rates = GridAxisField(serializers.FloatField(min_value=0.1, max_value=50.0))
+
+    def validate_customer_id(self, value):
+        try:
+            self.credit_profile = get_credit_profile(value)
+        except Customer.DoesNotExist:
+            raise serializers.ValidationError("Customer does not exist.")
+        return value
+
+    def validate(self, data):
+        cells = len(data['loan_amounts']) * len(data['tenures']) * len(data['interest_rates'])
+        if cells > settings.QUOTE_GRID_MAX_CELLS:
+            raise serializers.ValidationError(
+                f"The grid has {cells} quotes; at most {settings.QUOTE_GRID_MAX_CELLS} are allowed."
+            )
+        return data
+
+
+class EligibilityResponseSerializer(TimedSerializerMixin, serializers.Serializer):
     credit_score = serializers.IntegerField()
     approved_amount = serializers.IntegerField()
     approval_status = serializers.CharField()
@@ -85,7 +161,7 @@ class EligibilityResponseSerializer(serializers.Serializer):
     monthly_emi = serializers.FloatField()
 
 
-class LoanCreationSerializer(serializers.ModelSerializer):
+class LoanCreationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = ['customer', 'loan_amount', 'tenure', 'interest_rate', 'start_date']
@@ -100,9 +176,11 @@ class LoanCreationSerializer(serializers.ModelSerializer):
         customer = data['customer']
         loan_amount = data['loan_amount']
         
-        # Calculate current utilization
-        active_loans = Loan.objects.filter(customer=customer)
-        current_utilization = sum(loan.loan_amount for loan in active_loans)
+        # Read current utilization from the exposure ledger. The row stays locked
+        # until the surrounding transaction commits, so parallel creates for the
+        # same customer cannot both pass this check.
+        exposure = CustomerExposure.lock_for_customer(customer)
+        current_utilization = exposure.total_principal
         
         if current_utilization + loan_amount > customer.approved_limit:
             raise serializers.ValidationError(
@@ -111,3 +189,14 @@ class LoanCreationSerializer(serializers.ModelSerializer):
             )
         
         return data
+
+
+class ImportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'status', 'file_name', 'rows_processed', 'rows_created',
+            'rows_failed', 'rows_per_second', 'errors', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,58 @@
+"""
+Keep derived data in step with writes.
+
+The credit profile cache is invalidated on Loan and Customer save/delete,
+and on exposures_rebuilt for bulk imports and any other path that goes
+through CustomerExposure.rebuild. Deleted loans flag their snapshot days
+stale, since a deleted row leaves no updated_at for the next build to find.
+Saving or deleting a credit policy drops the cached active policy version.
+New database connections get the request metrics query timer.
+"""
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, metrics, policy
+from .models import CreditPolicy, Customer, CustomerExposure, Loan, PortfolioSnapshot, exposures_rebuilt
+
+
+def invalidate_profiles(customer_ids):
+    customer_ids = list(customer_ids)
+    cache.invalidate(customer_ids)
+    # A concurrent read can re-cache the old row before this transaction
+    # commits, so drop the entries again once it has
+    transaction.on_commit(lambda: cache.invalidate(customer_ids))
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def loan_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.customer_id])
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def customer_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_profiles([instance.customer_id])
+
+
+@receiver(exposures_rebuilt, sender=CustomerExposure)
+def exposures_changed(sender, customer_ids, **kwargs):
+    invalidate_profiles(customer_ids)
+
+
+@receiver([post_save, post_delete], sender=CreditPolicy)
+def credit_policy_changed(sender, instance, **kwargs):
+    policy.invalidate()
+    # Same race as the profile cache: re-read once the change is visible
+    transaction.on_commit(policy.invalidate)
+
+
+@receiver(post_delete, sender=Loan)
+def loan_deleted(sender, instance, **kwargs):
+    PortfolioSnapshot.objects.filter(date__in=[instance.start_date, instance.end_date]).update(stale=True)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.instrument_connection(connection)
@@ -0,0 +1,183 @@
+"""
+Daily portfolio snapshots for trend charts.
+
+build_snapshots() keeps one PortfolioSnapshot row per day holding the loan
+flows of that day. An incremental run only recomputes the days touched by
+loans whose updated_at is past the previous run's watermark (plus days
+flagged stale by a loan deletion or by Loan.save moving a loan off them),
+with GROUP BY queries restricted to those days. Writes that bypass the model
+(queryset.update) must set updated_at themselves, and flag the days a loan
+leaves, or the change is only picked up by a --full rebuild.
+
+snapshot_series() turns the flows into a trend: per-period flows plus
+running totals (active loans, outstanding exposure, EMIs due) carried from
+the rows before the range, so a chart reads one row per day in range.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from .models import Loan, PortfolioSnapshot, SnapshotBuild
+from .policy import active_policy
+
+
+# Re-scan this much before the watermark to catch transactions that were
+# still open when the previous run read the loans table
+WATERMARK_OVERLAP = timedelta(minutes=5)
+DAYS_PER_BATCH = 500
+SCORES = range(1, 11)
+
+FLOW_FIELDS = [
+    'loans_started', 'amount_started', 'emi_started',
+    'loans_matured', 'amount_matured', 'emi_matured',
+    'emis_total', 'emis_paid_on_time',
+]
+
+
+def loan_score(policy=None):
+    """
+    The active policy's score ladder applied to each loan's own on-time
+    record, as SQL. Days already built keep the ladder they were built
+    with until a --full rebuild.
+    """
+    policy = policy or active_policy()
+    return Case(
+        *(
+            When(GreaterThanOrEqual(F('emis_paid_on_time') * 100, F('tenure') * threshold), then=Value(score))
+            for threshold, score in policy.score_bands
+        ),
+        default=Value(policy.lowest_score),
+        output_field=IntegerField(),
+    )
+
+
+def compute_snapshots(days=None):
+    """
+    Snapshot rows for the given days (every day with a loan if None), from
+    three GROUP BY queries over the loans table.
+    """
+    started = Loan.objects.all() if days is None else Loan.objects.filter(start_date__in=days)
+    matured = Loan.objects.all() if days is None else Loan.objects.filter(end_date__in=days)
+    snapshots = {}
+
+    def snapshot(day):
+        if day not in snapshots:
+            snapshots[day] = PortfolioSnapshot(date=day, score_buckets=[0] * len(SCORES))
+        return snapshots[day]
+
+    for row in started.values('start_date').annotate(
+        loans=Count('loan_id'), amount=Sum('loan_amount'), emi=Sum('monthly_payment'),
+        emis=Sum('tenure'), paid=Sum('emis_paid_on_time'),
+    ).order_by():
+        day = snapshot(row['start_date'])
+        day.loans_started, day.amount_started, day.emi_started = row['loans'], row['amount'], row['emi']
+        day.emis_total, day.emis_paid_on_time = row['emis'], row['paid']
+
+    for start_date, score, loans in (
+        started.annotate(score=loan_score()).values_list('start_date', 'score').annotate(Count('loan_id')).order_by()
+    ):
+        snapshot(start_date).score_buckets[score - SCORES.start] = loans
+
+    for row in matured.values('end_date').annotate(
+        loans=Count('loan_id'), amount=Sum('loan_amount'), emi=Sum('monthly_payment'),
+    ).order_by():
+        day = snapshot(row['end_date'])
+        day.loans_matured, day.amount_matured, day.emi_matured = row['loans'], row['amount'], row['emi']
+
+    return list(snapshots.values())
+
+
+def replace_snapshots(days=None):
+    """Recompute and store the snapshot rows of the given days (all if None)"""
+    with transaction.atomic():
+        rows = PortfolioSnapshot.objects.all() if days is None else PortfolioSnapshot.objects.filter(date__in=days)
+        rows.delete()
+        snapshots = compute_snapshots(days)
+        PortfolioSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def build_snapshots(full=False):
+    """
+    Bring the snapshot table up to date. Without `full`, only days touched
+    since the last build are recomputed; the first build is always full.
+    Returns the SnapshotBuild row recording the run.
+    """
+    started_at = timezone.now()
+    last_build = SnapshotBuild.objects.order_by('-pk').first()
+    full = full or last_build is None
+
+    if full:
+        loans_scanned = Loan.objects.count()
+        days_rebuilt = replace_snapshots()
+    else:
+        changed = Loan.objects.filter(updated_at__gt=last_build.watermark - WATERMARK_OVERLAP)
+        loans_scanned = changed.count()
+        days = set(changed.values_list('start_date', flat=True).distinct())
+        days |= set(changed.values_list('end_date', flat=True).distinct())
+        days |= set(PortfolioSnapshot.objects.filter(stale=True).values_list('date', flat=True))
+        days = sorted(days)
+        for start in range(0, len(days), DAYS_PER_BATCH):
+            replace_snapshots(days[start:start + DAYS_PER_BATCH])
+        days_rebuilt = len(days)
+
+    return SnapshotBuild.objects.create(
+        full=full, watermark=started_at, days_rebuilt=days_rebuilt,
+        loans_scanned=loans_scanned, started_at=started_at,
+    )
+
+
+def snapshot_series(start, end, interval='day'):
+    """
+    Trend rows for start..end (inclusive), one per day or month that has a
+    snapshot. Flows are summed over the period; active_loans,
+    outstanding_exposure and emis_due are as of the end of the period's last
+    snapshot day (a loan ending on a day no longer counts at its end).
+    """
+    opening = PortfolioSnapshot.objects.filter(date__lt=start).aggregate(
+        active_loans=Coalesce(Sum(F('loans_started') - F('loans_matured')), 0),
+        outstanding_exposure=Coalesce(Sum(F('amount_started') - F('amount_matured')), 0),
+        emis_due=Coalesce(Sum(F('emi_started') - F('emi_matured')), 0.0),
+    )
+    rows = list(
+        PortfolioSnapshot.objects.filter(date__range=(start, end))
+        .order_by('date')
+        .values_list('date', *FLOW_FIELDS, 'score_buckets')
+    )
+    if not rows:
+        return []
+
+    frame = pd.DataFrame([row[:-1] for row in rows], columns=['date', *FLOW_FIELDS])
+    buckets = pd.DataFrame([row[-1] for row in rows], columns=list(SCORES)).fillna(0).astype(np.int64)
+    period = pd.to_datetime(frame.pop('date')).dt.strftime('%Y-%m' if interval == 'month' else '%Y-%m-%d')
+    flows = frame.groupby(period, sort=True).sum()
+    buckets = buckets.groupby(period, sort=True).sum()
+
+    active = opening['active_loans'] + (flows['loans_started'] - flows['loans_matured']).cumsum()
+    exposure = opening['outstanding_exposure'] + (flows['amount_started'] - flows['amount_matured']).cumsum()
+    emis_due = opening['emis_due'] + (flows['emi_started'] - flows['emi_matured']).cumsum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        on_time = (flows['emis_paid_on_time'] / flows['emis_total']).round(4)
+
+    return [
+        {
+            'period': label,
+            'loans_started': int(flows.at[label, 'loans_started']),
+            'amount_started': int(flows.at[label, 'amount_started']),
+            'loans_matured': int(flows.at[label, 'loans_matured']),
+            'amount_matured': int(flows.at[label, 'amount_matured']),
+            'active_loans': int(active[label]),
+            'outstanding_exposure': int(exposure[label]),
+            'emis_due': round(float(emis_due[label]), 2),
+            # Repayment record of the loans started in the period
+            'on_time_ratio': None if pd.isna(on_time[label]) else float(on_time[label]),
+            'score_buckets': {str(score): int(buckets.at[label, score]) for score in SCORES},
+        }
+        for label in flows.index
+    ]
@@ -0,0 +1,77 @@
+"""
+Synthetic portfolio generator for query-plan checks and benchmarks.
+
+Distributions are loosely modelled on a retail loan book: log-normal
+salaries, a handful of loans per customer sized against the approved
+limit, common tenures, and mostly-on-time repayment histories.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+
+from . import finance
+from .models import Customer, CustomerExposure, Loan, normalize_phone
+
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Rohan', 'Saanvi']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Reddy', 'Patel', 'Nair', 'Gupta', 'Singh', 'Das', 'Khan']
+TENURES = np.array([6, 12, 18, 24, 36, 48, 60, 84, 120, 180, 240])
+TENURE_WEIGHTS = np.array([4, 14, 8, 18, 20, 10, 12, 5, 4, 3, 2], dtype=float)
+
+
+def seed_portfolio(customers, loans_per_customer=5, seed=0, batch_size=5000):
+    """
+    Insert `customers` customers with Poisson(loans_per_customer) loans each.
+    Returns (customers_created, loans_created).
+    """
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    customers_created = loans_created = 0
+
+    for start in range(0, customers, batch_size):
+        size = min(batch_size, customers - start)
+        salaries = np.clip(rng.lognormal(np.log(50000), 0.6, size), 10000, 1_000_000).round(-2).astype(np.int64)
+        ages = np.clip(rng.normal(38, 10, size), 21, 70).astype(np.int64)
+        phones = rng.integers(6_000_000_000, 9_999_999_999, size)
+        first = rng.integers(0, len(FIRST_NAMES), size)
+        last = rng.integers(0, len(LAST_NAMES), size)
+
+        with transaction.atomic():
+            batch = Customer.objects.bulk_create([
+                Customer(
+                    first_name=FIRST_NAMES[f], last_name=LAST_NAMES[l], age=int(age),
+                    phone_number=str(phone), phone_digits=normalize_phone(str(phone)),
+                    monthly_salary=int(salary), approved_limit=int(salary) * 36,
+                )
+                for f, l, age, phone, salary in zip(first.tolist(), last.tolist(), ages, phones, salaries)
+            ])
+            customer_ids = np.array([customer.customer_id for customer in batch])
+
+            counts = rng.poisson(loans_per_customer, size)
+            owners = np.repeat(np.arange(size), counts)
+            n = len(owners)
+            amounts = (salaries[owners] * 36 * rng.uniform(0.03, 0.3, n)).round(-3).clip(min=1000).astype(np.int64)
+            tenures = rng.choice(TENURES, n, p=TENURE_WEIGHTS / TENURE_WEIGHTS.sum())
+            rates = np.clip(rng.normal(12, 3, n), 6, 24).round(2)
+            age_days = rng.integers(0, 8 * 365, n)
+            starts = np.array([today - timedelta(days=int(days)) for days in age_days])
+            elapsed = np.minimum(age_days // 30, tenures)
+            paid = np.floor(elapsed * rng.beta(8, 2, n)).astype(np.int64)
+
+            Loan.objects.bulk_create([
+                Loan(
+                    customer_id=int(customer_id), loan_amount=int(amount), tenure=int(tenure),
+                    interest_rate=float(rate), monthly_payment=float(payment),
+                    emis_paid_on_time=int(paid_count), start_date=start_date, end_date=end_date,
+                )
+                for customer_id, amount, tenure, rate, payment, paid_count, start_date, end_date in zip(
+                    customer_ids[owners], amounts, tenures, rates,
+                    finance.emi(amounts, rates, tenures), paid, starts, finance.end_dates(starts, tenures),
+                )
+            ], batch_size=1000)
+            CustomerExposure.rebuild(customer_ids.tolist())
+
+        customers_created += size
+        loans_created += n
+    return customers_created, loans_created
@@ -0,0 +1,1194 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import cache, finance, metrics, policy
+from .credit import get_credit_profile
+from .finance import calculate_emi, calculate_end_date
+from .ingest import ChunkValidator, import_customers, import_loans
+from .jobs import enqueue_upload, run_job
+from .models import (
+    CreditPolicy, CreditScoreSnapshot, Customer, CustomerExposure, IdempotencyKey, ImportJob, Loan, LoanSchedule,
+    Payment, PortfolioSnapshot, RescoreRun,
+)
+from .rescore import rescore, start_run
+from .routers import PIN_COOKIE, ReplicaReadMiddleware
+from .snapshots import build_snapshots
+from .views import calculate_credit_score
+
+
+def make_customer(**kwargs):
+    data = {
+        'first_name': 'Asha',
+        'last_name': 'Verma',
+        'age': 32,
+        'phone_number': '9876543210',
+        'monthly_salary': 80000,
+    }
+    data.update(kwargs)
+    return Customer.objects.create(**data)
+
+
+def make_loans(customer, count, **kwargs):
+    data = {
+        'loan_amount': 100000,
+        'tenure': 12,
+        'interest_rate': 10.0,
+        'emis_paid_on_time': 6,
+        'start_date': date(2024, 1, 1),
+    }
+    data.update(kwargs)
+    return [Loan.objects.create(customer=customer, **data) for _ in range(count)]
+
+
+class LoansAPITestCase(APITestCase):
+    """Starts every test with empty caches"""
+
+    def setUp(self):
+        super().setUp()
+        default_cache.clear()
+        policy.invalidate()
+        cache.get_cache().clear()
+        cache.stats.reset()
+        # Look up the active policy version now, so query counts are the request's own
+        policy.active_policy()
+
+
+class QueryCountTests(LoansAPITestCase):
+    """
+    Every endpoint in loans/urls.py issues a fixed number of queries,
+    however many rows it returns.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.other = make_customer(first_name='Ravi', phone_number='9123456780')
+        make_loans(cls.customer, 5)
+        make_loans(cls.other, 25)
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_register_customer(self):
+        payload = {
+            'first_name': 'Meera', 'last_name': 'Iyer', 'age': 41,
+            'phone_number': '9000000000', 'monthly_salary': 50000,
+        }
+        # SAVEPOINT, INSERT customer, INSERT exposure, RELEASE
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('register_customer'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_customer_list(self):
+        # COUNT, page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('customer_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_check_eligibility(self):
+        payload = {'customer_id': self.other.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('check_eligibility'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_check_eligibility_batch(self):
+        applications = [
+            {'customer_id': customer.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12}
+            for customer in (self.customer, self.other) * 50
+        ]
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('check_eligibility_batch'), applications, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 100)
+
+    def test_create_loan(self):
+        payload = {
+            'customer': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10,
+            'tenure': 12, 'start_date': (date.today() + timedelta(days=1)).isoformat(),
+        }
+        # SAVEPOINT, customer, locked exposure, SAVEPOINT, INSERT loan,
+        # UPDATE exposure, RELEASE, RELEASE
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse('create_loan'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_view_loan_by_id(self):
+        loan = self.other.loans.first()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('view_loan_by_id', args=[loan.loan_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['customer_details']['customer_id'], self.other.customer_id)
+
+    def test_view_loans_by_customer(self):
+        for customer, loan_count in ((self.customer, 5), (self.other, 25)):
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('view_loans_by_customer', args=[customer.customer_id]))
+            self.assertEqual(response.data['total_loans'], loan_count)
+
+    def test_loan_list(self):
+        # COUNT, page with customers joined
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('loan_list'))
+        self.assertEqual(len(response.data['results']), 20)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('loan_list'), {'customer_id': self.customer.customer_id, 'status': 'completed'})
+
+    def test_upload_excel_data(self):
+        rows = ''.join(f'{self.customer.customer_id},1000,12,10,{i % 12},2024-01-01\n' for i in range(40))
+        upload = SimpleUploadedFile(
+            'loans.csv',
+            ('customer_id,loan_amount,tenure,interest_rate,emis_paid_on_time,start_date\n' + rows).encode(),
+        )
+        # in_bulk, SAVEPOINT, INSERT, missing exposures, UPDATE exposures, RELEASE
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('upload_excel_data'), {'loan_file': upload}, format='multipart')
+        self.assertEqual(response.data['loans']['created'], 40)
+
+    def test_import_jobs(self):
+        upload = SimpleUploadedFile('customers.csv', b'first_name,last_name,age,phone_number,monthly_salary\n')
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('create_import_jobs'), {'customer_file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+
+        job_id = response.data['jobs'][0]['id']
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('view_import_job', args=[job_id]))
+        self.assertEqual(response.data['status'], ImportJob.STATUS_PENDING)
+
+
+class FinanceTests(SimpleTestCase):
+
+    def test_emi_arrays_match_scalar(self):
+        principals, rates, tenures = [100000, 250000, 5000, 12000], [10, 7.5, 50, 0], [12, 60, 1, 24]
+        self.assertEqual(
+            finance.emi(principals, rates, tenures).tolist(),
+            [calculate_emi(*loan) for loan in zip(principals, rates, tenures)],
+        )
+        self.assertEqual(calculate_emi(12000, 0, 24), 500)
+        self.assertAlmostEqual(calculate_emi(100000, 12, 12), 8884.88)
+        self.assertAlmostEqual(
+            finance.total_interest([100000], [12], [12])[0], 8884.88 * 12 - 100000,
+        )
+
+    def test_schedules_repay_the_principal(self):
+        principals, rates, tenures = [100000, 250000, 12000], [10, 7.5, 0], [12, 60, 24]
+        principal_parts, interest_parts, balances = finance.amortization_schedules(principals, rates, tenures)
+        self.assertEqual(principal_parts.shape, (3, 60))
+        for i, (principal, rate, tenure) in enumerate(zip(principals, rates, tenures)):
+            self.assertAlmostEqual(principal_parts[i].sum(), principal, places=6)
+            self.assertEqual(balances[i][tenure - 1], 0)
+            self.assertTrue((balances[i][tenure:] == 0).all() and (principal_parts[i][tenure:] == 0).all())
+            # Every month but the last pays the rounded EMI
+            payments = principal_parts[i][:tenure - 1] + interest_parts[i][:tenure - 1]
+            self.assertTrue(np.allclose(payments, calculate_emi(principal, rate, tenure)))
+        self.assertAlmostEqual(interest_parts[0][0], 100000 * 10 / 1200)
+
+        for single, batch in zip(finance.amortization_schedule(100000, 10, 12), (principal_parts, interest_parts, balances)):
+            self.assertTrue(np.array_equal(single, batch[0][:12]))
+
+    def test_add_months_clamps_to_month_end(self):
+        starts = [date(2024, 1, 31), date(2023, 1, 31), date(2024, 3, 31), date(2024, 8, 15), date(2024, 2, 29)]
+        months = [1, 1, 1, 17, 12]
+        expected = [date(2024, 2, 29), date(2023, 2, 28), date(2024, 4, 30), date(2026, 1, 15), date(2025, 2, 28)]
+        self.assertEqual(list(finance.add_months(starts, months)), expected)
+        self.assertEqual(list(finance.end_dates(starts, months)), expected)
+        self.assertEqual([calculate_end_date(start, n) for start, n in zip(starts, months)], expected)
+
+
+class ImportJobTests(LoansAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMPORT_JOBS_RUN_IN_PROCESS=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def enqueue(self, data):
+        upload = SimpleUploadedFile('customers.csv', data)
+        job = enqueue_upload(ImportJob.KIND_CUSTOMERS, upload)
+        self.assertTrue(default_storage.exists(job.file_path))
+        return job
+
+    def assert_spool_deleted(self, job):
+        self.assertFalse(default_storage.exists(job.file_path))
+
+    def test_spooled_upload_is_deleted_whatever_the_outcome(self):
+        done = self.enqueue(b'first_name,last_name,age,phone_number,monthly_salary\nAsha,Verma,32,9876543210,50000\n')
+        broken = self.enqueue(b'first_name\nAsha\n')
+        self.assertTrue(run_job(done.pk))
+        with self.assertLogs('loans.jobs', 'ERROR'):
+            self.assertTrue(run_job(broken.pk))
+        for job in (done, broken):
+            self.assert_spool_deleted(job)
+        done.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((done.status, done.rows_created), (ImportJob.STATUS_COMPLETED, 1))
+        self.assertEqual(broken.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Missing required columns", broken.error)
+
+    def test_stale_running_jobs_are_failed(self):
+        stale, live = self.enqueue(b''), self.enqueue(b'')
+        long_ago = timezone.now() - timedelta(hours=2)
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.STATUS_RUNNING, started_at=long_ago, heartbeat_at=long_ago,
+        )
+        ImportJob.objects.filter(pk=live.pk).update(
+            status=ImportJob.STATUS_RUNNING, started_at=long_ago, heartbeat_at=timezone.now(),
+        )
+        out = io.StringIO()
+        with self.assertLogs('loans.jobs', 'WARNING'):
+            call_command('process_import_jobs', '--once', stdout=out)
+        self.assertIn(f"Job {stale.pk} stopped reporting progress", out.getvalue())
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.STATUS_FAILED)
+        self.assert_spool_deleted(stale)
+        self.assertEqual(ImportJob.objects.get(pk=live.pk).status, ImportJob.STATUS_RUNNING)
+
+
+class EligibilityBatchTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.good = make_customer()
+        cls.poor = make_customer(phone_number='9000000002')
+        make_loans(cls.good, 1, emis_paid_on_time=12)
+        make_loans(cls.poor, 2, emis_paid_on_time=1)
+
+    def batch(self, body, **params):
+        url = reverse('check_eligibility_batch')
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, body, format='json')
+
+    def test_results_match_single_checks_in_request_order(self):
+        applications = [
+            {'customer_id': customer.customer_id, 'loan_amount': amount, 'interest_rate': 11, 'tenure': 24}
+            for customer, amount in ((self.poor, 20000), (self.good, 50000), (self.good, 5000000), (self.poor, 1000))
+        ]
+        results = self.batch({'applications': applications}).data['results']
+        for application, result in zip(applications, results):
+            single = self.client.post(reverse('check_eligibility'), application, format='json').data
+            self.assertEqual(result, {'customer_id': application['customer_id'], **single})
+        statuses = [result['approval_status'] for result in results]
+        self.assertEqual(statuses, ['rejected', 'approved', 'partial', 'rejected'])
+
+    def test_invalid_applications_get_errors_in_place(self):
+        valid = {'customer_id': self.good.customer_id, 'loan_amount': 1000, 'interest_rate': 11, 'tenure': 12}
+        body = [valid, {**valid, 'customer_id': 999999}, {**valid, 'tenure': 400}, 'nonsense']
+        results = self.batch(body).data['results']
+        self.assertEqual(results[0]['approval_status'], 'approved')
+        self.assertEqual(results[1:], [
+            {'customer_id': 999999, 'error': "Customer does not exist."},
+            {'customer_id': self.good.customer_id, 'error': "tenure must be at most 360"},
+            {'customer_id': None, 'error': "customer_id must be a whole number"},
+        ])
+
+    def test_large_batches_stream_ndjson(self):
+        application = {'customer_id': self.good.customer_id, 'loan_amount': 1000, 'interest_rate': 11, 'tenure': 12}
+        response = self.batch([application] * 2, output='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['approval_status'] for line in lines], ['approved', 'approved'])
+        with override_settings(ELIGIBILITY_BATCH_STREAM_THRESHOLD=2):
+            self.assertTrue(self.batch([application] * 3).streaming)
+
+    def test_streamed_batches_are_scored_a_chunk_at_a_time(self):
+        application = {'customer_id': self.good.customer_id, 'loan_amount': 1000, 'interest_rate': 11, 'tenure': 12}
+        body = [application, {**application, 'customer_id': self.poor.customer_id}, {}] * 2
+        expected = self.batch(body).data['results']
+        with mock.patch('loans.credit.BATCH_CHUNK_SIZE', 4):
+            response = self.batch(body, output='ndjson')
+            chunks = [chunk.decode().splitlines() for chunk in response.streaming_content]
+        self.assertEqual([len(lines) for lines in chunks], [4, 2])
+        self.assertEqual([json.loads(line) for lines in chunks for line in lines], expected)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch({'applications': 'all'}).status_code, 400)
+        with override_settings(ELIGIBILITY_BATCH_MAX_SIZE=1):
+            self.assertEqual(self.batch([{}, {}]).status_code, 400)
+
+
+class CreditProfileTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.loans = [
+            make_loans(cls.customer, 1, loan_amount=1000 + n, tenure=12, emis_paid_on_time=n % 13)[0]
+            for n in range(150)
+        ]
+
+    def test_profile_matches_loans(self):
+        profile = get_credit_profile(self.customer.customer_id)
+        self.assertEqual(profile.current_utilization, sum(loan.loan_amount for loan in self.loans))
+        self.assertEqual(profile.total_emis, 150 * 12)
+        self.assertEqual(profile.total_paid_on_time, sum(loan.emis_paid_on_time for loan in self.loans))
+        self.assertEqual(profile.active_loan_count, sum(loan.emis_paid_on_time < 12 for loan in self.loans))
+        self.assertEqual(profile.available_limit, self.customer.approved_limit - profile.current_utilization)
+        # 879 of 1800 EMIs on time is 48.8%
+        self.assertEqual(calculate_credit_score(self.customer), 5)
+
+    def test_eligibility_queries_do_not_grow_with_loans(self):
+        newcomer = make_customer(phone_number='9000000001')
+        for customer in (newcomer, self.customer):
+            payload = {'customer_id': customer.customer_id, 'loan_amount': 1000, 'interest_rate': 12, 'tenure': 12}
+            with self.assertNumQueries(1):
+                response = self.client.post(reverse('check_eligibility'), payload, format='json')
+            self.assertEqual(response.status_code, 200)
+
+    def test_unknown_customer(self):
+        payload = {'customer_id': 999999, 'loan_amount': 1000, 'interest_rate': 12, 'tenure': 12}
+        response = self.client.post(reverse('check_eligibility'), payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['customer_id'], ["Customer does not exist."])
+
+
+class ExposureLedgerTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+
+    def totals(self):
+        exposure = CustomerExposure.objects.get(customer=self.customer)
+        return exposure.total_principal, exposure.total_emis, exposure.emis_paid_on_time, exposure.active_loan_count
+
+    def test_loan_writes_adjust_totals(self):
+        first, second = make_loans(self.customer, 2, loan_amount=4000, tenure=10, emis_paid_on_time=4)
+        self.assertEqual(self.totals(), (8000, 20, 8, 2))
+
+        first.emis_paid_on_time = 10
+        first.loan_amount = 5000
+        first.save()
+        self.assertEqual(self.totals(), (9000, 20, 14, 1))
+
+        second.delete()
+        self.assertEqual(self.totals(), (5000, 10, 10, 0))
+        self.assertEqual(CustomerExposure.find_drift([self.customer.customer_id]), [])
+
+    def test_update_with_missing_row_counts_loan_once(self):
+        loan, = make_loans(self.customer, 1, loan_amount=4000, tenure=10, emis_paid_on_time=4)
+        CustomerExposure.objects.filter(customer=self.customer).delete()
+        loan.emis_paid_on_time = 5
+        loan.save()
+        self.assertEqual(self.totals(), (4000, 10, 5, 1))
+        self.assertEqual(CustomerExposure.find_drift([self.customer.customer_id]), [])
+
+    def test_create_loan_checks_limit_on_locked_row(self):
+        make_loans(self.customer, 1, loan_amount=self.customer.approved_limit - 1000)
+        payload = {
+            'customer': self.customer.customer_id, 'loan_amount': 2000, 'interest_rate': 10,
+            'tenure': 12, 'start_date': (date.today() + timedelta(days=1)).isoformat(),
+        }
+        with mock.patch.object(
+            CustomerExposure, 'lock_for_customer', wraps=CustomerExposure.lock_for_customer,
+        ) as lock:
+            response = self.client.post(reverse('create_loan'), payload, format='json')
+        lock.assert_called_once_with(self.customer)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Available: ₹1,000", str(response.data))
+
+        payload['loan_amount'] = 1000
+        self.assertEqual(self.client.post(reverse('create_loan'), payload, format='json').status_code, 201)
+        self.assertEqual(self.totals()[0], self.customer.approved_limit)
+
+    def test_rebuild_exposures_command(self):
+        make_loans(self.customer, 3, loan_amount=1000)
+        CustomerExposure.objects.filter(customer=self.customer).update(total_principal=1, active_loan_count=0)
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_exposures', '--check', stdout=out)
+        self.assertIn("1 exposure rows out of date", out.getvalue())
+
+        call_command('rebuild_exposures', stdout=out)
+        self.assertEqual(self.totals(), (3000, 36, 18, 3))
+        call_command('rebuild_exposures', '--check', stdout=out)
+
+
+class IngestTests(LoansAPITestCase):
+
+    def test_validator_keeps_first_problem_per_row(self):
+        check = ChunkValidator(pd.DataFrame({'age': ['30', '', '2.5', '17', 'x'], 'salary': ['1', '1', '1', '1', '0']}))
+        ages = check.integer('age', minimum=18)
+        check.integer('salary', minimum=1)
+        self.assertEqual(check.problems.tolist(), [
+            '', 'age must be a whole number', 'age must be a whole number', 'age must be at least 18',
+            'age must be a whole number',
+        ])
+        self.assertEqual(check.valid.tolist(), [True, False, False, False, False])
+        self.assertEqual(ages[0], 30)
+
+    def test_customers_report_errors_by_file_row(self):
+        data = (
+            'First Name,Last Name,Age,Phone Number,Monthly Salary\n'
+            'Asha,Verma,32,9876543210,50000\n'
+            ',Rao,40,9876543211,50000\n'
+            'Ravi,Rao,15,9876543212,50000\n'
+            'Meera,Iyer,41,9876543213,60000\n'
+            'Kiran,Das,29,9876543214,-5\n'
+        )
+        result = import_customers(io.BytesIO(data.encode()), 'customers.csv', chunk_size=2)
+        self.assertEqual((result.created, result.failed), (2, 3))
+        self.assertEqual(result.errors, [
+            'Row 2: first_name is required', 'Row 3: age must be at least 18', 'Row 5: monthly_salary must be at least 1',
+        ])
+        meera = Customer.objects.get(first_name='Meera')
+        self.assertEqual(meera.approved_limit, 60000 * 36)
+        self.assertEqual(CustomerExposure.objects.get(customer=meera).total_principal, 0)
+
+    def test_loans_are_priced_and_reach_the_ledger(self):
+        customer = make_customer()
+        data = (
+            'customer_id,loan_amount,tenure,interest_rate,emis_paid_on_time,start_date\n'
+            f'{customer.customer_id},100000,12,10,3,2024-01-31\n'
+            '999999,1000,12,10,0,2024-01-01\n'
+            f'{customer.customer_id},1000,12,60,0,2024-01-01\n'
+            f'{customer.customer_id},1000,12,10,0,not a date\n'
+        )
+        result = import_loans(io.BytesIO(data.encode()), 'loans.csv')
+        self.assertEqual(result.errors, [
+            'Row 2: Customer 999999 not found',
+            'Row 3: interest_rate must be between 0.1 and 50.0',
+            'Row 4: start_date is not a valid date',
+        ])
+        loan = Loan.objects.get(customer=customer)
+        self.assertAlmostEqual(loan.monthly_payment, calculate_emi(100000, 10, 12))
+        self.assertEqual(loan.end_date, date(2025, 1, 31))
+        self.assertEqual(CustomerExposure.find_drift([customer.customer_id]), [])
+
+
+class CursorPaginationTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        make_loans(cls.customer, 45)
+
+    def test_walks_every_loan_once_without_counting(self):
+        seen = []
+        url = reverse('loan_list') + '?pagination=cursor'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen.extend(loan['loan_id'] for loan in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(Loan.objects.values_list('loan_id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_page_number_pagination_is_still_the_default(self):
+        response = self.client.get(reverse('customer_list'))
+        self.assertEqual(response.data['count'], 1)
+
+    def test_customer_cursor_page_size(self):
+        make_customer(first_name='Ravi')
+        response = self.client.get(reverse('customer_list'), {'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+
+class CustomerSearchTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = make_customer(first_name='Asha', last_name='Verma', phone_number='+91 98765 43210')
+        cls.ashok = make_customer(first_name='Ashok', last_name='Nair', phone_number='09123456780')
+        cls.vasha = make_customer(first_name='Vasha', last_name='Reddy', phone_number='9988776655')
+
+    def search(self, term):
+        response = self.client.get(reverse('customer_list'), {'search': term})
+        return [customer['customer_id'] for customer in response.data['results']]
+
+    def test_phone_prefix_ignores_formatting(self):
+        self.assertEqual(self.search('98765'), [self.asha.customer_id])
+        self.assertEqual(self.search('+91-98765 43210'), [self.asha.customer_id])
+        self.assertEqual(self.search('0912 345'), [self.ashok.customer_id])
+        self.assertEqual(self.search('+91 9123'), [self.ashok.customer_id])
+
+    def test_name_matches_are_ranked(self):
+        self.assertEqual(self.search('asha'), [self.asha.customer_id, self.vasha.customer_id])
+        self.assertEqual(self.search('ash'), [self.ashok.customer_id, self.asha.customer_id, self.vasha.customer_id])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('asha verma'), [self.asha.customer_id])
+        self.assertEqual(self.search('asha nair'), [])
+
+    def test_admin_uses_search_backend(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+
+        model_admin = site._registry[Customer]
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            RequestFactory().get('/'), Customer.objects.all(), '98765'
+        )
+        self.assertEqual(list(queryset), [self.asha])
+        self.assertFalse(may_have_duplicates)
+
+
+class CreditCacheTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        make_loans(cls.customer, 2)
+
+    def check(self):
+        payload = {'customer_id': self.customer.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12}
+        return self.client.post(reverse('check_eligibility'), payload, format='json').data
+
+    def test_repeat_quotes_are_served_from_cache(self):
+        self.check()
+        with self.assertNumQueries(0):
+            self.check()
+        stats = self.client.get(reverse('credit_cache_stats')).data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_loan_writes_invalidate(self):
+        score = self.check()['credit_score']
+        make_loans(self.customer, 3, emis_paid_on_time=0)
+        self.assertLess(self.check()['credit_score'], score)
+
+    def test_customer_update_invalidates(self):
+        self.check()
+        # Two loans of 100000 are outstanding
+        self.customer.approved_limit = 200100
+        self.customer.save()
+        self.assertEqual(self.check()['approved_amount'], 100)
+
+    def test_bulk_import_invalidates(self):
+        score = self.check()['credit_score']
+        upload = SimpleUploadedFile(
+            'loans.csv',
+            f'customer_id,loan_amount,tenure,interest_rate,emis_paid_on_time,start_date\n'
+            f'{self.customer.customer_id},1000,120,10,0,2024-01-01\n'.encode(),
+        )
+        self.client.post(reverse('upload_excel_data'), {'loan_file': upload}, format='multipart')
+        self.assertLess(self.check()['credit_score'], score)
+
+
+class CreditPolicyTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        # 50% of EMIs paid on time: score 6 under the default ladder
+        make_loans(cls.customer, 2)
+
+    def check(self):
+        payload = {'customer_id': self.customer.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12}
+        return self.client.post(reverse('check_eligibility'), payload, format='json').data
+
+    def make_policy(self, **kwargs):
+        data = {
+            'score_bands': [[40, 9], [20, 4]],
+            'approval_tiers': [[8, 1.0, 1], [4, 0.5, 3]],
+            'max_interest_rate': 20,
+        }
+        data.update(kwargs)
+        return CreditPolicy.objects.create(**data)
+
+    def test_default_policy_scalar_and_array_agree(self):
+        default = policy.DEFAULT_POLICY
+        paid = list(range(0, 101))
+        self.assertEqual(default.scores([100] * len(paid), paid).tolist(), [default.score(100, n) for n in paid])
+        self.assertEqual((default.score(100, 89), default.score(100, 90), default.score(100, 9)), (9, 10, 1))
+        self.assertEqual(default.score(0, 0), 10)
+
+        scores = [1, 2, 3, 4, 5, 6, 7, 10, 7]
+        limits = [10**6] * 8 + [-500]
+        many = default.evaluate_many(scores, limits, [50000] * 9, [49.0] * 9, [12] * 9)
+        for i, score in enumerate(scores):
+            single = default.evaluate(score, limits[i], 50000, 49.0, 12)
+            self.assertEqual({key: values.tolist()[i] for key, values in many.items()}, single)
+
+    def test_activating_a_policy_changes_offers(self):
+        self.assertEqual((self.check()['credit_score'], self.check()['approval_status']), (6, 'partial'))
+
+        self.make_policy().activate()
+        with self.assertNumQueries(2):
+            offer = self.check()
+        self.assertEqual(offer['credit_score'], 9)
+        self.assertEqual((offer['approval_status'], offer['suggested_interest_rate']), ('approved', 13))
+        with self.assertNumQueries(0):
+            self.check()
+
+        batch = self.client.post(reverse('check_eligibility_batch'), [{
+            'customer_id': self.customer.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12,
+        }], format='json').json()['results'][0]
+        self.assertEqual({key: batch[key] for key in offer}, offer)
+
+    def test_only_one_policy_is_active(self):
+        first, second = self.make_policy(), self.make_policy(max_interest_rate=13)
+        first.activate()
+        second.activate()
+        self.assertEqual(list(CreditPolicy.objects.filter(is_active=True)), [second])
+        self.assertEqual(self.check()['suggested_interest_rate'], 13)
+        second.delete()
+        self.assertEqual(self.check()['credit_score'], 6)
+
+    def test_active_policy_rules_are_fixed(self):
+        from django.contrib.admin.sites import site
+
+        model_admin = site._registry[CreditPolicy]
+        active = self.make_policy()
+        self.assertNotIn('score_bands', model_admin.get_readonly_fields(None, active))
+        active.activate()
+        self.assertEqual(self.check()['suggested_interest_rate'], 13)
+        self.assertIn('score_bands', model_admin.get_readonly_fields(None, active))
+
+        active.name = 'Renamed'
+        active.full_clean()
+        active.save()
+        active.max_interest_rate = 12
+        with self.assertRaises(ValidationError):
+            active.full_clean()
+        # Outside the admin too
+        with self.assertRaises(ValidationError):
+            active.save()
+        with self.assertRaises(ValidationError):
+            CreditPolicy.objects.filter(pk=active.pk).update(max_interest_rate=12)
+        with self.assertRaises(ValidationError):
+            CreditPolicy.objects.filter(pk=active.pk).update(activated_at=None)
+        self.assertEqual(CreditPolicy.objects.get(pk=active.pk).max_interest_rate, 20)
+        self.assertEqual(self.check()['suggested_interest_rate'], 13)
+
+        draft = self.make_policy()
+        draft.max_interest_rate = 12
+        draft.save()
+        CreditPolicy.objects.filter(pk=draft.pk).update(lowest_score=2)
+        CreditPolicy.objects.update(name='Renamed again')
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValidationError):
+            self.make_policy(score_bands=[[40, 11]]).full_clean()
+        with self.assertRaises(ValidationError):
+            self.make_policy(approval_tiers=[[5, 0.8]]).full_clean()
+
+
+class RescoreTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers = [make_customer(phone_number=f'98765{n:05}') for n in range(5)]
+        for paid, customer in enumerate(cls.customers[1:]):
+            make_loans(customer, 2, emis_paid_on_time=paid * 3)
+
+    def scores(self, run):
+        return dict(CreditScoreSnapshot.objects.filter(run=run).values_list('customer_id', 'credit_score'))
+
+    def test_scores_match_eligibility(self):
+        run = start_run('baseline')
+        self.assertEqual(rescore(run, workers=1, chunk_size=2)[0], 5)
+        run.refresh_from_db()
+        self.assertEqual((run.checkpoint, run.customers_scored), (self.customers[-1].customer_id, 5))
+        self.assertIsNotNone(run.finished_at)
+        for customer_id, score in self.scores(run).items():
+            offer = self.client.post(reverse('check_eligibility'), {
+                'customer_id': customer_id, 'loan_amount': 1000, 'interest_rate': 10, 'tenure': 12,
+            }, format='json').data
+            self.assertEqual(score, offer['credit_score'])
+
+    def test_resume_from_checkpoint(self):
+        run = start_run('interrupted')
+        RescoreRun.objects.filter(pk=run.pk).update(checkpoint=self.customers[2].customer_id, customers_scored=3)
+        run.refresh_from_db()
+        self.assertEqual(rescore(run, workers=1, chunk_size=2)[0], 2)
+        self.assertEqual(set(self.scores(run)), {customer.customer_id for customer in self.customers[3:]})
+        self.assertEqual(RescoreRun.objects.get(pk=run.pk).customers_scored, 5)
+
+    def test_command_compares_runs(self):
+        call_command('rescore_portfolio', 'before', workers=1, stdout=io.StringIO())
+        CreditPolicy.objects.create(score_bands=[[0, 2]], approval_tiers=[[3, 1.0, 0]], new_customer_score=3).activate()
+        out = io.StringIO()
+        call_command('rescore_portfolio', 'after', workers=1, compare='before', stdout=out)
+        self.assertIn("Scored 5 customers", out.getvalue())
+        self.assertIn("Against before: 1 scores up, 4 down, 0 unchanged, 0 not in before", out.getvalue())
+        self.assertEqual(set(self.scores(RescoreRun.objects.get(label='after')).values()), {2, 3})
+
+        out = io.StringIO()
+        call_command('rescore_portfolio', 'after', workers=1, stdout=out)
+        self.assertIn("already finished", out.getvalue())
+
+
+class QuoteGridTests(LoansAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        make_loans(cls.customer, 2, emis_paid_on_time=5)
+
+    def quote(self, **payload):
+        return self.client.post(reverse('quote_grid'), {'customer_id': self.customer.customer_id, **payload}, format='json')
+
+    def test_grid_matches_single_checks(self):
+        with self.assertNumQueries(1):
+            grid = self.quote(
+                loan_amounts=[100000, 2000000], tenures={'min': 12, 'max': 36, 'step': 12}, interest_rates=[9.5, 14],
+            ).data
+        self.assertEqual(grid['tenures'], [12, 24, 36])
+        for i, amount in enumerate(grid['loan_amounts']):
+            for j, tenure in enumerate(grid['tenures']):
+                for k, rate in enumerate(grid['interest_rates']):
+                    single = self.client.post(reverse('check_eligibility'), {
+                        'customer_id': self.customer.customer_id, 'loan_amount': amount,
+                        'interest_rate': rate, 'tenure': tenure,
+                    }, format='json').data
+                    for key in ('approved_amount', 'approval_status', 'suggested_interest_rate', 'monthly_emi'):
+                        self.assertEqual(grid[key][i][j][k], single[key], (key, amount, tenure, rate))
+
+    def test_axis_validation(self):
+        response = self.quote(loan_amounts=[0], tenures=[12], interest_rates={'min': 8, 'max': 7, 'step': 1})
+        self.assertEqual(set(response.data), {'loan_amounts', 'interest_rates'})
+        with override_settings(QUOTE_GRID_MAX_CELLS=100):
+            response = self.quote(
+                loan_amounts=[50000], tenures={'min': 1, 'max': 50, 'step': 1}, interest_rates=[10, 12, 14],
+            )
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_finite_ranges_are_rejected(self):
+        for interest_rates in (
+            {'min': 8, 'max': 'inf', 'step': 1},
+            {'min': 8, 'max': 12, 'step': 'nan'},
+            {'min': -1e308, 'max': 1e308, 'step': 1},
+        ):
+            response = self.quote(loan_amounts=[50000], tenures=[12], interest_rates=interest_rates)
+            self.assertEqual(response.status_code, 400, interest_rates)
+            self.assertEqual(set(response.data), {'interest_rates'})
+
+
+class PaymentImportTests(LoansAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        # 12 EMIs from February 2024, 6 of them already paid on time
+        cls.loan, cls.other = make_loans(cls.customer, 2)
+
+    def upload(self, *lines):
+        upload = SimpleUploadedFile('payments.csv', '\n'.join(['loan_id,installment,paid_date', *lines]).encode())
+        return self.client.post(reverse('upload_excel_data'), {'payment_file': upload}, format='multipart').data
+
+    def test_payments_update_counters_incrementally(self):
+        score = self.client.post(reverse('check_eligibility'), {
+            'customer_id': self.customer.customer_id, 'loan_amount': 1000, 'interest_rate': 12, 'tenure': 12,
+        }, format='json').data['credit_score']
+        loan_id = self.loan.loan_id
+        result = self.upload(
+            f'{loan_id},7,2024-08-01', f'{loan_id},8,2024-08-20', f'{loan_id},9,2024-10-15',
+            f'{loan_id},7,2024-08-01', f'{loan_id},13,2025-02-01', '999999,1,2024-02-01',
+        )['payments']
+        self.assertEqual((result['created'], result['failed']), (3, 3))
+        self.assertIn("Row 4: installment appears more than once in the file", result['errors'])
+        self.assertIn("Row 5: installment is past the loan's tenure", result['errors'])
+        self.assertIn("Row 6: Loan not found", result['errors'])
+
+        # Installment 9 fell due on 2024-10-01 and was paid late
+        self.assertEqual(
+            list(Payment.objects.order_by('installment').values_list('installment', 'due_date', 'on_time')),
+            [(7, date(2024, 8, 1), True), (8, date(2024, 9, 1), True), (9, date(2024, 10, 1), False)],
+        )
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.emis_paid_on_time, 8)
+        self.assertEqual(CustomerExposure.find_drift([self.customer.customer_id]), [])
+        score_after = self.client.post(reverse('check_eligibility'), {
+            'customer_id': self.customer.customer_id, 'loan_amount': 1000, 'interest_rate': 12, 'tenure': 12,
+        }, format='json').data['credit_score']
+        self.assertGreaterEqual(score_after, score)
+        self.assertEqual(cache.stats.invalidations, 1)
+
+        # The duplicate check reads only the installments the file records
+        with CaptureQueriesContext(connection) as queries:
+            result = self.upload(f'{loan_id},8,2024-08-20', f'{loan_id},10,2024-11-01')['payments']
+        self.assertEqual(result['errors'], ["Row 1: installment is already recorded"])
+        self.assertEqual(result['created'], 1)
+        lookup, = [query['sql'] for query in queries if query['sql'].startswith('SELECT "payments"."loan_id"')]
+        self.assertIn('"payments"."installment" IN (8, 10)', lookup)
+
+    def test_rejected_rows_can_be_repeated_corrected(self):
+        loan_id = self.loan.loan_id
+        result = self.upload(f'{loan_id},7,not a date', f'{loan_id},7,2024-08-01', f'{loan_id},7,2024-08-02')['payments']
+        self.assertEqual((result['created'], result['failed']), (1, 2))
+        self.assertEqual(result['errors'], [
+            "Row 1: paid_date must be a valid date", "Row 3: installment appears more than once in the file",
+        ])
+        self.assertEqual(Payment.objects.get().paid_date, date(2024, 8, 1))
+
+    def test_paying_off_a_loan_closes_it(self):
+        loan_id = self.other.loan_id
+        self.upload(*(f'{loan_id},{installment},2024-01-15' for installment in range(7, 13)))
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.emis_paid_on_time, 12)
+        exposure = CustomerExposure.objects.get(customer=self.customer)
+        self.assertEqual(exposure.active_loan_count, 1)
+        self.assertEqual(CustomerExposure.find_drift([self.customer.customer_id]), [])
+
+
+class LoanScheduleTests(LoansAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan, = make_loans(make_customer(), 1, loan_amount=120000, tenure=24, interest_rate=12.0)
+
+    def schedule(self, **params):
+        return self.client.get(reverse('loan_schedule', args=[self.loan.loan_id]), params)
+
+    def test_built_once_and_sliced(self):
+        with self.assertNumQueries(2):
+            full = self.schedule().data
+        self.assertEqual(len(full['schedule']), 24)
+        self.assertEqual(full['schedule'][0]['due_date'], '2024-02-01')
+        self.assertAlmostEqual(sum(row['principal'] for row in full['schedule']), 120000, places=1)
+        self.assertEqual(full['schedule'][-1]['balance'], 0)
+        # 6 EMIs paid: the balance after month 6, not 18 x EMI
+        self.assertEqual(full['outstanding_principal'], full['schedule'][5]['balance'])
+
+        with self.assertNumQueries(1):
+            part = self.schedule(**{'from': 3, 'to': 5}).data
+        self.assertEqual(part['schedule'], full['schedule'][2:5])
+        self.assertEqual(self.schedule(**{'from': 5, 'to': 25}).status_code, 400)
+
+    def test_rebuilt_when_terms_change(self):
+        interest = self.schedule().data['schedule'][0]['interest']
+        Loan.objects.filter(pk=self.loan.pk).update(interest_rate=18.0, monthly_payment=5990.43)
+        self.assertGreater(self.schedule().data['schedule'][0]['interest'], interest)
+        self.assertEqual(LoanSchedule.objects.count(), 1)
+
+
+class PortfolioSummaryTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.loans = (
+            make_loans(make_customer(), 2, start_date=today.replace(day=1))
+            + make_loans(make_customer(), 3, loan_amount=50000, interest_rate=14.0, emis_paid_on_time=1,
+                         start_date=date(2020, 1, 1))
+        )
+        make_customer(first_name='Nobody')
+
+    def test_summary(self):
+        # loan totals, monthly buckets, score groups; then cached
+        with self.assertNumQueries(3):
+            summary = self.client.get(reverse('portfolio_summary')).data
+        with self.assertNumQueries(0):
+            self.client.get(reverse('portfolio_summary'))
+
+        self.assertEqual(summary['loan_count'], 5)
+        self.assertEqual(summary['total_disbursed'], 350000)
+        self.assertAlmostEqual(
+            summary['outstanding_balance'], sum(loan.remaining_amount for loan in self.loans), places=2
+        )
+        self.assertAlmostEqual(summary['weighted_average_interest_rate'], (200000 * 10 + 150000 * 14) / 350000, places=4)
+        self.assertEqual((summary['active_loans'], summary['completed_loans']), (2, 3))
+        self.assertEqual(
+            summary['monthly_disbursements'],
+            [{'month': date.today().strftime('%Y-%m'), 'loans': 2, 'amount': 200000}],
+        )
+        # 50% on time, 1/12 on time, and a customer without loans
+        distribution = {row['score']: row['customers'] for row in summary['score_distribution'] if row['customers']}
+        self.assertEqual(distribution, {6: 1, 1: 1, 10: 1})
+
+    def test_rejects_bad_month_window(self):
+        self.assertEqual(self.client.get(reverse('portfolio_summary'), {'months': 0}).status_code, 400)
+
+
+class PortfolioSnapshotTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        make_loans(cls.customer, 2, start_date=date(2024, 1, 1), tenure=12, emis_paid_on_time=12)
+        make_loans(cls.customer, 1, start_date=date(2024, 1, 15), tenure=6, emis_paid_on_time=0, loan_amount=60000)
+
+    def series(self, **params):
+        params = {'from': '2023-12-01', 'to': '2025-06-30', **params}
+        return self.client.get(reverse('portfolio_snapshots'), params).data['results']
+
+    def test_monthly_trend(self):
+        build_snapshots()
+        rows = {row['period']: row for row in self.series()}
+        self.assertEqual(list(rows), ['2024-01', '2024-07', '2025-01'])
+        self.assertEqual(rows['2024-01']['loans_started'], 3)
+        self.assertEqual(rows['2024-01']['outstanding_exposure'], 260000)
+        self.assertEqual(rows['2024-01']['on_time_ratio'], round(24 / 30, 4))
+        self.assertEqual(rows['2024-01']['score_buckets']['10'], 2)
+        self.assertEqual(rows['2024-01']['score_buckets']['1'], 1)
+        self.assertEqual(rows['2024-07']['active_loans'], 2)
+        self.assertEqual(rows['2025-01']['outstanding_exposure'], 0)
+
+    def test_opening_balance_carries_into_range(self):
+        build_snapshots()
+        rows = self.series(**{'from': '2024-07-01', 'interval': 'day'})
+        self.assertEqual(rows[0]['period'], '2024-07-15')
+        self.assertEqual((rows[0]['active_loans'], rows[0]['outstanding_exposure']), (2, 200000))
+
+    def test_incremental_build_only_touches_changed_days(self):
+        # Outside the watermark overlap window
+        Loan.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        build_snapshots()
+        make_loans(self.customer, 1, start_date=date(2024, 3, 1), tenure=1)
+        build = build_snapshots()
+        self.assertFalse(build.full)
+        self.assertEqual((build.loans_scanned, build.days_rebuilt), (1, 2))
+        self.assertEqual(PortfolioSnapshot.objects.get(date=date(2024, 3, 1)).loans_started, 1)
+
+    def test_deleted_loans_are_rebuilt(self):
+        build_snapshots()
+        Loan.objects.filter(start_date=date(2024, 1, 15)).get().delete()
+        self.assertTrue(PortfolioSnapshot.objects.get(date=date(2024, 1, 15)).stale)
+        build_snapshots()
+        self.assertFalse(PortfolioSnapshot.objects.filter(date=date(2024, 1, 15)).exists())
+        self.assertEqual(self.series()[0]['loans_started'], 2)
+
+    def test_moved_loans_leave_their_old_days(self):
+        build_snapshots()
+        loan = Loan.objects.get(start_date=date(2024, 1, 15))
+        loan.start_date, loan.end_date = date(2024, 2, 1), date(2024, 8, 1)
+        loan.save()
+        self.assertEqual(
+            set(PortfolioSnapshot.objects.filter(stale=True).values_list('date', flat=True)),
+            {date(2024, 1, 15), date(2024, 7, 15)},
+        )
+        build_snapshots()
+        started = dict(PortfolioSnapshot.objects.values_list('date', 'loans_started'))
+        matured = dict(PortfolioSnapshot.objects.values_list('date', 'loans_matured'))
+        self.assertNotIn(date(2024, 1, 15), started)
+        self.assertNotIn(date(2024, 7, 15), matured)
+        self.assertEqual((started[date(2024, 2, 1)], matured[date(2024, 8, 1)]), (1, 1))
+        self.assertEqual(sum(started.values()), 3)
+
+
+class ExportTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.other = make_customer(first_name='Ravi', phone_number='9123456780')
+        make_loans(cls.customer, 3, emis_paid_on_time=3)
+        make_loans(cls.other, 2, start_date=date.today(), tenure=24)
+
+    def export(self, name, **params):
+        # One streamed query, however many rows (plus the SAVEPOINT and
+        # RELEASE of its transaction inside the test's)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(name), params)
+            content = b''.join(response.streaming_content).decode()
+        return response, content
+
+    def test_loans_csv_matches_model_properties(self):
+        response, content = self.export('export_loans')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(len(rows), 5)
+        for row in rows:
+            loan = Loan.objects.get(pk=row['loan_id'])
+            self.assertAlmostEqual(float(row['total_amount']), loan.total_amount, places=2)
+            self.assertAlmostEqual(float(row['remaining_amount']), loan.remaining_amount, places=2)
+            self.assertAlmostEqual(float(row['payment_percentage']), loan.payment_percentage, places=2)
+
+    def test_loans_ndjson_with_list_filters(self):
+        response, content = self.export('export_loans', output='ndjson', status='active')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual({row['customer_id'] for row in rows}, {self.other.customer_id})
+        self.assertEqual(len(rows), 2)
+
+    def test_customers(self):
+        response, content = self.export('export_customers', search='ravi')
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual([row['customer_id'] for row in rows], [str(self.other.customer_id)])
+        self.assertEqual(rows[0]['current_debt'], '200000')
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get(reverse('export_loans'), {'output': 'xml'}).status_code, 400)
+
+
+class MetricsTests(LoansAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        make_loans(cls.customer, 3)
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_per_view_histograms(self):
+        self.client.get(reverse('view_loans_by_customer', args=[self.customer.customer_id]))
+        text = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('loans_request_db_queries_sum{view="view_loans_by_customer"} 2', text)
+        self.assertIn('loans_request_db_queries_count{view="view_loans_by_customer"} 1', text)
+        self.assertIn('loans_request_duration_seconds_bucket{view="view_loans_by_customer",le="+Inf"} 1', text)
+        self.assertIn('loans_credit_cache_hits_total 0', text)
+        _, serializer_time = metrics.SERIALIZER_DURATION.snapshot()['view_loans_by_customer']
+        self.assertGreater(serializer_time, 0)
+        self.assertEqual(self.client.post(reverse('metrics')).status_code, 405)
+
+    def test_streamed_response_size(self):
+        response = self.client.get(reverse('export_loans'))
+        size = len(b''.join(response.streaming_content))
+        counts, total = metrics.RESPONSE_SIZE.snapshot()['export_loans']
+        self.assertEqual((sum(counts), total), (1, size))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=1e-6)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('loans.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('view_loans_by_customer', args=[self.customer.customer_id]))
+        self.assertIn('2 queries', logs.output[0])
+        self.assertIn('FROM "loans"', logs.output[0])
+
+
+class IdempotencyTests(LoansAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+
+    def create(self, key, **overrides):
+        payload = {
+            'customer': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10,
+            'tenure': 12, 'start_date': (date.today() + timedelta(days=1)).isoformat(), **overrides,
+        }
+        return self.client.post(reverse('create_loan'), payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        first = self.create('retry-1')
+        self.assertEqual(first.status_code, 201)
+        # Key lookup only: no customer, exposure or loan queries
+        with self.assertNumQueries(3):
+            second = self.create('retry-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(second.content), json.loads(first.content))
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+        self.assertEqual(self.create('retry-1', loan_amount=20000).status_code, 422)
+        self.assertEqual(self.create('retry-2').status_code, 201)
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 2)
+
+    def test_rejected_request_releases_key(self):
+        self.assertEqual(self.create('retry-1', loan_amount=10 ** 9).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.create('retry-1').status_code, 201)
+
+    def test_expired_keys_are_reused_and_purged(self):
+        self.create('old')
+        self.create('new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(hours=25))
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+        IdempotencyKey.objects.filter(key='new').update(created_at=timezone.now() - timedelta(hours=25))
+        self.assertNotIn('Idempotent-Replayed', self.create('new'))
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 3)
+
+
+class AsyncViewTests(LoansAPITestCase):
+    """The async endpoints return what their sync counterparts do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.loans = make_loans(cls.customer, 4)
+
+    async def assert_same(self, sync_name, async_name, args=(), payload=None, queries=None):
+        if payload is None:
+            expected = await self.async_client.get(reverse(sync_name, args=args))
+            metrics.reset()
+            actual = await self.async_client.get(reverse(async_name, args=args))
+        else:
+            expected = await self.async_client.post(reverse(sync_name), payload, content_type='application/json')
+            await cache.get_cache().adelete(cache.profile_key(payload['customer_id']))
+            metrics.reset()
+            actual = await self.async_client.post(reverse(async_name), payload, content_type='application/json')
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+        # assertNumQueries can't run on the event loop; the metrics middleware counts them instead
+        (counts, query_total), = metrics.DB_QUERIES.snapshot().values()
+        self.assertEqual(query_total, queries)
+
+    async def test_check_eligibility(self):
+        payload = {'customer_id': self.customer.customer_id, 'loan_amount': 50000, 'interest_rate': 12, 'tenure': 12}
+        await self.assert_same('check_eligibility', 'async_check_eligibility', payload=payload, queries=1)
+        missing = {**payload, 'customer_id': 999999}
+        await self.assert_same('check_eligibility', 'async_check_eligibility', payload=missing, queries=1)
+
+    async def test_view_loan_by_id(self):
+        await self.assert_same('view_loan_by_id', 'async_view_loan_by_id', args=[self.loans[0].loan_id], queries=1)
+        await self.assert_same('view_loan_by_id', 'async_view_loan_by_id', args=[999999], queries=1)
+
+    async def test_view_loans_by_customer(self):
+        await self.assert_same(
+            'view_loans_by_customer', 'async_view_loans_by_customer', args=[self.customer.customer_id], queries=2
+        )
+        await self.assert_same('view_loans_by_customer', 'async_view_loans_by_customer', args=[999999], queries=1)
+
+
+class ReplicaRoutingTests(LoansAPITestCase):
+    def routed(self, request, writes=False):
+        """The database the request's reads were routed to, and its response"""
+        seen = {}
+
+        def view(request):
+            seen['alias'] = router.db_for_read(Loan)
+            if writes:
+                make_customer()
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        response = ReplicaReadMiddleware(view)(request)
+        return seen['alias'], response
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_use_replica_until_client_writes(self):
+        factory = RequestFactory()
+        alias, response = self.routed(factory.get('/api/loans/'))
+        self.assertEqual(alias, 'replica1')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        # A read-only POST reads the primary but doesn't pin
+        alias, response = self.routed(factory.post('/api/check-eligibility'))
+        self.assertEqual(alias, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        alias, response = self.routed(factory.post('/api/create-loan'), writes=True)
+        self.assertEqual(alias, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+        pinned = factory.get('/api/loans/')
+        pinned.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.routed(pinned)[0], 'default')
+        self.assertEqual(router.db_for_write(Loan), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'loans'))
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_streamed_export_reads_through_router(self):
+        # 'default' standing in for a replica, as a test MIRROR would
+        make_loans(make_customer(), 3)
+        response = self.client.get(reverse('export_loans'))
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Customer endpoints
@@ -8,11 +8,31 @@ urlpatterns = [
     
     # Loan endpoints
     path('check-eligibility', views.check_eligibility, name='check_eligibility'),
+    path('check-eligibility/batch', views.check_eligibility_batch, name='check_eligibility_batch'),
+    path('quote-grid', views.quote_grid, name='quote_grid'),
     path('create-loan', views.create_loan, name='create_loan'),
     path('view-loan/<int:loan_id>', views.view_loan_by_id, name='view_loan_by_id'),
+    path('view-loan/<int:loan_id>/schedule', views.loan_schedule, name='loan_schedule'),
     path('view-loans/<int:customer_id>', views.view_loans_by_customer, name='view_loans_by_customer'),
     path('loans/', views.LoanListView.as_view(), name='loan_list'),
+
+    # Async (ASGI) versions of the eligibility and loan read endpoints
+    path('async/check-eligibility', async_views.check_eligibility, name='async_check_eligibility'),
+    path('async/view-loan/<int:loan_id>', async_views.view_loan_by_id, name='async_view_loan_by_id'),
+    path('async/view-loans/<int:customer_id>', async_views.view_loans_by_customer, name='async_view_loans_by_customer'),
+
+    # Reporting
+    path('portfolio/summary', views.portfolio_summary, name='portfolio_summary'),
+    path('portfolio/snapshots', views.portfolio_snapshots, name='portfolio_snapshots'),
+    path('export/loans', views.export_loans, name='export_loans'),
+    path('export/customers', views.export_customers, name='export_customers'),
     
     # Data import
     path('upload-excel', views.upload_excel_data, name='upload_excel_data'),
+    path('import-jobs', views.create_import_jobs, name='create_import_jobs'),
+    path('import-jobs/<int:job_id>', views.view_import_job, name='view_import_job'),
+
+    # Operations
+    path('cache/credit', views.credit_cache_stats, name='credit_cache_stats'),
+    path('_metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,24 +1,38 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
+import json
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import Customer, Loan
+from django.views.decorators.http import require_GET
+from django.db import transaction
+from .models import Customer, ImportJob, Loan
+from .credit import (
+    evaluate_application, evaluate_batch, evaluate_batch_chunks, get_credit_profile, quote_grid as build_quote_grid,
+)
 from .serializers import (
     CustomerSerializer, LoanSerializer, LoanDetailSerializer,
     EligibilityCheckSerializer, EligibilityResponseSerializer,
-    LoanCreationSerializer
+    LoanCreationSerializer, ImportJobSerializer, QuoteGridSerializer
 )
-import pandas as pd
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-import io
+from .ingest import import_customers, import_loans, import_payments
+from . import cache, export, idempotency, metrics, schedules
+from .jobs import enqueue_upload
+from .pagination import OptionalCursorPaginationMixin
+from .policy import active_policy
+from .reports import portfolio_summary as build_portfolio_summary
+from .snapshots import snapshot_series
+from .search import search_customers
 
 
 def calculate_credit_score(customer):
     """
     Calculate credit score based on EMI payment history
-    Logic:
+    Logic (the default credit policy; see loans/policy.py):
     - 90-100% EMIs paid on time: score = 10
     - 80-89%: score = 9
     - 70-79%: score = 8
@@ -29,51 +43,11 @@ def calculate_credit_score(customer):
     - 20-29%: score = 3
     - 10-19%: score = 2
     - 0-9%: score = 1
+
+    Reads the customer's cached profile (or exposure row), so the cost does
+    not grow with the number of loans.
     """
-    loans = Loan.objects.filter(customer=customer)
-    
-    if not loans.exists():
-        return 10  # New customer gets highest score initially
-    
-    total_emis = sum(loan.tenure for loan in loans)
-    total_paid_on_time = sum(loan.emis_paid_on_time for loan in loans)
-    
-    if total_emis == 0:
-        return 10
-    
-    payment_percentage = (total_paid_on_time / total_emis) * 100
-    
-    if payment_percentage >= 90:
-        return 10
-    elif payment_percentage >= 80:
-        return 9
-    elif payment_percentage >= 70:
-        return 8
-    elif payment_percentage >= 60:
-        return 7
-    elif payment_percentage >= 50:
-        return 6
-    elif payment_percentage >= 40:
-        return 5
-    elif payment_percentage >= 30:
-        return 4
-    elif payment_percentage >= 20:
-        return 3
-    elif payment_percentage >= 10:
-        return 2
-    else:
-        return 1
-
-
-def calculate_emi(principal, rate, tenure):
-    """Calculate EMI using the standard formula"""
-    monthly_rate = rate / (12 * 100)
-    if monthly_rate > 0:
-        emi = (principal * monthly_rate * ((1 + monthly_rate) ** tenure)) / \
-              (((1 + monthly_rate) ** tenure) - 1)
-    else:
-        emi = principal / tenure
-    return round(emi, 2)
+    return get_credit_profile(customer.customer_id).credit_score
 
 
 @api_view(['POST'])
@@ -105,71 +79,140 @@ def check_eligibility(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     validated_data = serializer.validated_data
-    customer_id = validated_data['customer_id']
-    loan_amount = validated_data['loan_amount']
-    interest_rate = validated_data['interest_rate']
-    tenure = validated_data['tenure']
-    
-    customer = get_object_or_404(Customer, customer_id=customer_id)
-    credit_score = calculate_credit_score(customer)
-    
-    # Calculate available credit limit
-    active_loans = Loan.objects.filter(customer=customer)
-    current_utilization = sum(loan.loan_amount for loan in active_loans)
-    available_limit = customer.approved_limit - current_utilization
-    
-    # Determine approval logic based on credit score
-    if credit_score >= 7:
-        approved_amount = min(loan_amount, available_limit)
-        approval_status = 'approved' if approved_amount >= loan_amount else 'partial'
-        suggested_rate = interest_rate
-    elif credit_score >= 5:
-        approved_amount = min(loan_amount * 0.8, available_limit)  # 80% of requested amount
-        approval_status = 'partial' if approved_amount > 0 else 'rejected'
-        suggested_rate = interest_rate + 2  # Add 2% to interest rate
-    elif credit_score >= 3:
-        approved_amount = min(loan_amount * 0.6, available_limit)  # 60% of requested amount
-        approval_status = 'partial' if approved_amount > 0 else 'rejected'
-        suggested_rate = interest_rate + 4  # Add 4% to interest rate
-    else:
-        approved_amount = 0
-        approval_status = 'rejected'
-        suggested_rate = interest_rate + 6  # Add 6% to interest rate
-    
-    # Ensure suggested rate doesn't exceed 50%
-    suggested_rate = min(suggested_rate, 50.0)
     
-    # Calculate EMI for approved amount
-    monthly_emi = calculate_emi(approved_amount, suggested_rate, tenure) if approved_amount > 0 else 0
-    
-    response_data = {
-        'credit_score': credit_score,
-        'approved_amount': int(approved_amount),
-        'approval_status': approval_status,
-        'suggested_interest_rate': round(suggested_rate, 2),
-        'monthly_emi': monthly_emi
-    }
+    # The serializer already loaded the customer's credit profile
+    profile = serializer.credit_profile
+    policy = active_policy()
+    response_data = evaluate_application(
+        profile.score(policy),
+        profile.available_limit,
+        validated_data['loan_amount'],
+        validated_data['interest_rate'],
+        validated_data['tenure'],
+        policy=policy,
+    )
     
     return Response(response_data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
-def create_loan(request):
+def check_eligibility_batch(request):
     """
-    POST /api/create-loan
-    Create a new loan after eligibility check
+    POST /api/check-eligibility/batch
+    Check eligibility for many applications at once. Body is a list of
+    {customer_id, loan_amount, interest_rate, tenure} objects, or
+    {"applications": [...]}. Results come back in request order; large
+    batches (or ?output=ndjson) are streamed as NDJSON, one result per line,
+    scored a chunk at a time so the first lines go out before the rest of
+    the batch is scored.
+    """
+    applications = request.data
+    if isinstance(applications, dict):
+        applications = applications.get('applications')
+    if not isinstance(applications, list) or not applications:
+        return Response(
+            {'error': 'Provide a non-empty list of applications'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(applications) > settings.ELIGIBILITY_BATCH_MAX_SIZE:
+        return Response(
+            {'error': f'At most {settings.ELIGIBILITY_BATCH_MAX_SIZE} applications per batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    stream = (
+        request.query_params.get('output') == 'ndjson'
+        or len(applications) > settings.ELIGIBILITY_BATCH_STREAM_THRESHOLD
+    )
+    if stream:
+        lines = (
+            ''.join(json.dumps(result) + '\n' for result in results)
+            for results in evaluate_batch_chunks(applications)
+        )
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+    results = evaluate_batch(applications)
+    return Response({'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def quote_grid(request):
+    """
+    POST /api/quote-grid
+    Offers for every combination of loan_amounts, tenures and interest_rates
+    (each a list or {"min", "max", "step"}) for one customer, scored once.
+    Result arrays are indexed [amount][tenure][rate].
     """
-    serializer = LoanCreationSerializer(data=request.data)
+    serializer = QuoteGridSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    loan = serializer.save()
-    response_serializer = LoanDetailSerializer(loan)
-    
+
+    validated_data = serializer.validated_data
+    profile = serializer.credit_profile
+    policy = active_policy()
+    credit_score = profile.score(policy)
+    grid = build_quote_grid(
+        credit_score,
+        profile.available_limit,
+        validated_data['loan_amounts'],
+        validated_data['tenures'],
+        validated_data['interest_rates'],
+        policy=policy,
+    )
     return Response({
-        'message': 'Loan created successfully',
-        'loan': response_serializer.data
-    }, status=status.HTTP_201_CREATED)
+        'customer_id': profile.customer_id,
+        'credit_score': credit_score,
+        'available_limit': profile.available_limit,
+        'loan_amounts': validated_data['loan_amounts'],
+        'tenures': validated_data['tenures'],
+        'interest_rates': validated_data['interest_rates'],
+        **{key: values.tolist() for key, values in grid.items() if key != 'credit_score'},
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def create_loan(request):
+    """
+    POST /api/create-loan
+    Create a new loan after eligibility check. With an Idempotency-Key
+    header, retrying a successful request returns its original response.
+    """
+    key = request.headers.get(idempotency.HEADER)
+    if key is not None and not 0 < len(key) <= idempotency.MAX_KEY_LENGTH:
+        return Response(
+            {'detail': f"{idempotency.HEADER} must be 1 to {idempotency.MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Validation locks the customer's exposure row, so the limit check and
+    # the insert must share one transaction (as does the idempotency key)
+    with transaction.atomic():
+        record = None
+        if key is not None:
+            request_hash = idempotency.fingerprint(request.data)
+            record, replay = idempotency.claim(key, request_hash)
+            if replay:
+                if record.request_hash != request_hash:
+                    return Response(
+                        {'detail': f"{idempotency.HEADER} was already used with a different request body."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+        serializer = LoanCreationSerializer(data=request.data)
+        if not serializer.is_valid():
+            # Releases the idempotency key too, so a corrected retry can use it
+            transaction.set_rollback(True)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        loan = serializer.save()
+        data = {
+            'message': 'Loan created successfully',
+            'loan': LoanDetailSerializer(loan).data
+        }
+        if record is not None:
+            idempotency.store(record, status.HTTP_201_CREATED, data)
+
+    return Response(data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
@@ -178,11 +221,41 @@ def view_loan_by_id(request, loan_id):
     GET /api/view-loan/<loan_id>
     Get loan details by loan ID
     """
-    loan = get_object_or_404(Loan, loan_id=loan_id)
+    loan = get_object_or_404(Loan.objects.select_related('customer'), loan_id=loan_id)
     serializer = LoanDetailSerializer(loan)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+def loan_schedule(request, loan_id):
+    """
+    GET /api/view-loan/<loan_id>/schedule?from=1&to=<tenure>
+    Month-by-month principal, interest and balance (months from..to)
+    """
+    loan = get_object_or_404(Loan.objects.select_related('schedule'), loan_id=loan_id)
+    try:
+        first = int(request.query_params.get('from', 1))
+        last = int(request.query_params.get('to', loan.tenure))
+    except ValueError:
+        return Response({'error': 'from and to must be month numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= first <= last <= loan.tenure:
+        return Response(
+            {'error': f'from and to must satisfy 1 <= from <= to <= {loan.tenure}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'loan_id': loan.loan_id,
+        'tenure': loan.tenure,
+        'monthly_payment': loan.monthly_payment,
+        'emis_paid_on_time': loan.emis_paid_on_time,
+        'outstanding_principal': schedules.outstanding_principal(loan),
+        'from': first,
+        'to': last,
+        'schedule': schedules.schedule_rows(loan, first, last),
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 def view_loans_by_customer(request, customer_id):
     """
@@ -190,20 +263,23 @@ def view_loans_by_customer(request, customer_id):
     Get all loans for a specific customer
     """
     customer = get_object_or_404(Customer, customer_id=customer_id)
-    loans = Loan.objects.filter(customer=customer).order_by('-created_at')
+    # The related manager hands every loan this customer instance, so the
+    # serializer's customer fields don't query per row
+    loans = list(customer.loans.order_by('-created_at'))
     serializer = LoanDetailSerializer(loans, many=True)
     
     return Response({
         'customer': CustomerSerializer(customer).data,
         'loans': serializer.data,
-        'total_loans': loans.count()
+        'total_loans': len(loans)
     }, status=status.HTTP_200_OK)
 
 
-class CustomerListView(generics.ListAPIView):
+class CustomerListView(OptionalCursorPaginationMixin, generics.ListAPIView):
     """
     GET /api/customers
-    List all customers with pagination
+    List all customers with pagination (?pagination=cursor for keyset pages).
+    ?search= matches names or a phone number prefix, best matches first.
     """
     queryset = Customer.objects.all().order_by('-created_at')
     serializer_class = CustomerSerializer
@@ -212,51 +288,83 @@ class CustomerListView(generics.ListAPIView):
         queryset = super().get_queryset()
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(phone_number__icontains=search)
-            )
+            # Keyset pages need the (created_at, pk) order, so only rank page-number results
+            queryset = search_customers(queryset, search, rank=not self.wants_cursor_pagination())
         return queryset
 
 
-class LoanListView(generics.ListAPIView):
+def filter_loans(queryset, params):
+    """Apply the /api/loans query-string filters (customer_id, status) to a Loan queryset"""
+    # Filter by customer
+    customer_id = params.get('customer_id')
+    if customer_id:
+        queryset = queryset.filter(customer_id=customer_id)
+    
+    # Filter by status: active loans have not reached their end date yet
+    status_filter = params.get('status')
+    if status_filter == 'active':
+        queryset = queryset.filter(end_date__gte=date.today())
+    elif status_filter == 'completed':
+        queryset = queryset.filter(end_date__lt=date.today())
+    
+    return queryset
+
+
+class LoanListView(OptionalCursorPaginationMixin, generics.ListAPIView):
     """
     GET /api/loans
-    List all loans with pagination and filtering
+    List all loans with pagination and filtering (?pagination=cursor for keyset pages)
     """
-    queryset = Loan.objects.all().order_by('-created_at')
+    queryset = Loan.objects.select_related('customer').order_by('-created_at')
     serializer_class = LoanSerializer
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Filter by customer
-        customer_id = self.request.query_params.get('customer_id')
-        if customer_id:
-            queryset = queryset.filter(customer__customer_id=customer_id)
-        
-        # Filter by status (you might want to add a status field)
-        status_filter = self.request.query_params.get('status')
-        if status_filter:
-            # This is a simple implementation, you might want to add actual status logic
-            if status_filter == 'active':
-                queryset = queryset.filter(end_date__gte=date.today())
-            elif status_filter == 'completed':
-                queryset = queryset.filter(end_date__lt=date.today())
-        
-        return queryset
+        return filter_loans(super().get_queryset(), self.request.query_params)
+
+
+def export_response(request, name, stream):
+    output = request.query_params.get('output', 'csv')
+    if output not in export.EXPORT_FORMATS:
+        return Response(
+            {'error': f"output must be one of: {', '.join(export.EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    response = StreamingHttpResponse(stream(output), content_type=export.EXPORT_FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="{name}-{date.today():%Y%m%d}.{output}"'
+    return response
+
+
+@api_view(['GET'])
+def export_loans(request):
+    """
+    GET /api/export/loans?output=csv|ndjson
+    Stream the whole loan book; accepts the same filters as /api/loans
+    """
+    loans = filter_loans(Loan.objects.all(), request.query_params)
+    return export_response(request, 'loans', lambda output: export.stream_loans(loans, output))
+
+
+@api_view(['GET'])
+def export_customers(request):
+    """
+    GET /api/export/customers?output=csv|ndjson
+    Stream every customer with current debt; accepts ?search= like /api/customers
+    """
+    customers = search_customers(Customer.objects.all(), request.query_params.get('search'), rank=False)
+    return export_response(request, 'customers', lambda output: export.stream_customers(customers, output))
 
 
 @api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
 def upload_excel_data(request):
     """
     POST /api/upload-excel
-    Upload customer and loan data from Excel files
+    Upload customer, loan and EMI payment data from Excel or CSV files.
+    Rows are validated and inserted in bulk, chunk by chunk.
     """
-    if 'customer_file' not in request.FILES and 'loan_file' not in request.FILES:
+    if not any(field in request.FILES for field in ('customer_file', 'loan_file', 'payment_file')):
         return Response(
-            {'error': 'Please provide customer_file or loan_file'},
+            {'error': 'Please provide customer_file, loan_file or payment_file'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
@@ -266,40 +374,7 @@ def upload_excel_data(request):
     if 'customer_file' in request.FILES:
         customer_file = request.FILES['customer_file']
         try:
-            # Read Excel file
-            if customer_file.name.endswith('.xlsx') or customer_file.name.endswith('.xls'):
-                df = pd.read_excel(customer_file)
-            else:
-                df = pd.read_csv(customer_file)
-            
-            customers_created = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    customer_data = {
-                        'first_name': row.get('first_name', ''),
-                        'last_name': row.get('last_name', ''),
-                        'age': int(row.get('age', 0)),
-                        'phone_number': str(row.get('phone_number', '')),
-                        'monthly_salary': int(row.get('monthly_salary', 0))
-                    }
-                    
-                    serializer = CustomerSerializer(data=customer_data)
-                    if serializer.is_valid():
-                        serializer.save()
-                        customers_created += 1
-                    else:
-                        errors.append(f"Row {index + 1}: {serializer.errors}")
-                
-                except Exception as e:
-                    errors.append(f"Row {index + 1}: {str(e)}")
-            
-            results['customers'] = {
-                'created': customers_created,
-                'errors': errors[:10]  # Limit errors to first 10
-            }
-            
+            results['customers'] = import_customers(customer_file, customer_file.name).as_dict()
         except Exception as e:
             results['customers'] = {'error': str(e)}
     
@@ -307,52 +382,124 @@ def upload_excel_data(request):
     if 'loan_file' in request.FILES:
         loan_file = request.FILES['loan_file']
         try:
-            # Read Excel file
-            if loan_file.name.endswith('.xlsx') or loan_file.name.endswith('.xls'):
-                df = pd.read_excel(loan_file)
-            else:
-                df = pd.read_csv(loan_file)
-            
-            loans_created = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Get customer
-                    customer_id = int(row.get('customer_id', 0))
-                    customer = Customer.objects.get(customer_id=customer_id)
-                    
-                    loan_data = {
-                        'customer': customer.customer_id,
-                        'loan_amount': int(row.get('loan_amount', 0)),
-                        'tenure': int(row.get('tenure', 0)),
-                        'interest_rate': float(row.get('interest_rate', 0)),
-                        'start_date': row.get('start_date', date.today())
-                    }
-                    
-                    serializer = LoanCreationSerializer(data=loan_data)
-                    if serializer.is_valid():
-                        loan = serializer.save()
-                        # Update EMIs paid on time if provided
-                        emis_paid = row.get('emis_paid_on_time', 0)
-                        if emis_paid:
-                            loan.emis_paid_on_time = int(emis_paid)
-                            loan.save()
-                        loans_created += 1
-                    else:
-                        errors.append(f"Row {index + 1}: {serializer.errors}")
-                
-                except Customer.DoesNotExist:
-                    errors.append(f"Row {index + 1}: Customer {customer_id} not found")
-                except Exception as e:
-                    errors.append(f"Row {index + 1}: {str(e)}")
-            
-            results['loans'] = {
-                'created': loans_created,
-                'errors': errors[:10]  # Limit errors to first 10
-            }
-            
+            results['loans'] = import_loans(loan_file, loan_file.name).as_dict()
         except Exception as e:
             results['loans'] = {'error': str(e)}
     
+    # Process payment file
+    if 'payment_file' in request.FILES:
+        payment_file = request.FILES['payment_file']
+        try:
+            results['payments'] = import_payments(payment_file, payment_file.name).as_dict()
+        except Exception as e:
+            results['payments'] = {'error': str(e)}
+    
     return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def create_import_jobs(request):
+    """
+    POST /api/import-jobs
+    Queue customer, loan and/or EMI payment files for background import.
+    Returns immediately with one job per file; poll GET /api/import-jobs/<id>.
+    """
+    files = {
+        ImportJob.KIND_CUSTOMERS: request.FILES.get('customer_file'),
+        ImportJob.KIND_LOANS: request.FILES.get('loan_file'),
+        ImportJob.KIND_PAYMENTS: request.FILES.get('payment_file'),
+    }
+    if not any(files.values()):
+        return Response(
+            {'error': 'Please provide customer_file, loan_file or payment_file'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    jobs = [enqueue_upload(kind, uploaded) for kind, uploaded in files.items() if uploaded]
+    return Response(
+        {'jobs': ImportJobSerializer(jobs, many=True).data},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(['GET'])
+def view_import_job(request, job_id):
+    """
+    GET /api/import-jobs/<job_id>
+    Progress of a background import: rows done, errors and rows/second
+    """
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return Response(ImportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def portfolio_summary(request):
+    """
+    GET /api/portfolio/summary
+    Portfolio totals, score distribution and monthly disbursements for the
+    dashboard (?months=, default 12). Cached for PORTFOLIO_SUMMARY_CACHE_SECONDS.
+    """
+    try:
+        months = int(request.query_params.get('months', 12))
+    except ValueError:
+        months = 0
+    if not 1 <= months <= 120:
+        return Response({'error': 'months must be between 1 and 120'}, status=status.HTTP_400_BAD_REQUEST)
+
+    key = f'portfolio-summary:{months}'
+    summary = default_cache.get(key)
+    if summary is None:
+        summary = build_portfolio_summary(months)
+        default_cache.set(key, summary, settings.PORTFOLIO_SUMMARY_CACHE_SECONDS)
+    return Response(summary, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def portfolio_snapshots(request):
+    """
+    GET /api/portfolio/snapshots?from=YYYY-MM-DD&to=YYYY-MM-DD&interval=day|month
+    Portfolio trend from the daily snapshot table (default: the last year, by month)
+    """
+    try:
+        end = date.fromisoformat(request.query_params.get('to', date.today().isoformat()))
+        start = date.fromisoformat(request.query_params.get('from', (end - timedelta(days=365)).isoformat()))
+    except ValueError:
+        return Response({'error': 'from and to must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+    interval = request.query_params.get('interval', 'month')
+    if interval not in ('day', 'month'):
+        return Response({'error': 'interval must be day or month'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'interval': interval,
+        'results': snapshot_series(start, end, interval),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def credit_cache_stats(request):
+    """
+    GET /api/cache/credit
+    Hit/miss counters of the credit profile cache (this worker process only)
+    """
+    return Response(cache.stats.as_dict(), status=status.HTTP_200_OK)
+
+
+@require_GET
+def metrics_view(request):
+    """
+    GET /api/_metrics
+    Per-view request histograms and cache counters in Prometheus text format
+    """
+    credit_cache = cache.stats.as_dict()
+    text = metrics.render_prometheus([
+        ('loans_credit_cache_hits_total', 'counter', 'Credit profile cache hits', credit_cache['hits']),
+        ('loans_credit_cache_misses_total', 'counter', 'Credit profile cache misses', credit_cache['misses']),
+        ('loans_credit_cache_invalidations_total', 'counter', 'Credit profile cache entries invalidated',
+         credit_cache['invalidations']),
+    ])
+    return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')